@@ -20,14 +20,25 @@ See https://github.com/StanTraykov/dumbarb for more info.
 """
 
 import argparse
+import asyncio
+import collections
 import configparser
 import contextlib
 import datetime
+import glob
+import gzip
+import itertools
+import json
+import math
 import os
 import queue
 import re
+import select
 import shlex
+import signal
+import socket
 import string
+import struct
 import subprocess
 import sys
 import textwrap
@@ -35,6 +46,20 @@ import threading
 import time
 import traceback
 
+try:
+    import fcntl
+    import termios
+except ImportError:  # not available on Windows
+    fcntl = termios = None
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+try:
+    import sqlite3
+except ImportError:  # Python built without SQLite
+    sqlite3 = None
+
 # CONFIG
 
 DUMBARB = 'dumbarb'
@@ -45,6 +70,7 @@ DUMBVER = '0.3.5'
 # decreases restart credit by more than 1. Running without problems restores
 # restart credit, up to the starting amount, ENGINE_RESTART, after one hour.
 ENGINE_RESTART = 10
+ENGINE_HANG_SEVERITY = 2  # restart credit used up by a genmove hang
 
 # results format
 
@@ -61,11 +87,23 @@ RESULT_NONE = 'None'  # ended w/passes but couldn't/wasn't instructed to score
 RESULT_UFIN = 'UFIN'  # game interrupted (illegal move?)
 RESULT_OERR = 'ERR'   # some error occured
 
+# early stopping (StopRule); the verdict is also written to the results log,
+# as a line starting with FMT_STOP_PRE
+
+LOS_MIN_GAMES = 20  # default minimum number of games for 'los' StopRule
+FMT_STOP_PRE = '# '
+FMT_SPRT = ('SPRT [{elo0:g}, {elo1:g}] after {n} games (+{w} ={d} -{l}):'
+            ' LLR {llr:.3f} (bounds {lo:.3f}, {hi:.3f})')
+FMT_LOS = ('LOS after {n} games (+{w} ={d} -{l}): {name1} stronger than'
+           ' {name2} with {los:.2%} likelihood (threshold {conf:.2%})')
+
 REASON_ILMV = 'IL'  # one of the engines didn't like a move ('? illegal move')
 REASON_JIGO = '=='  # jigo
 REASON_NONE = 'XX'  # scoring was not requeted
 REASON_SCOR = 'SD'  # scorer problem
 REASON_OERR = 'EE'  # some error occured
+REASON_ADJU = 'Adj'    # adjudicated (score estimate margin)
+REASON_MAXM = 'MaxMv'  # MaxMoves reached (scored, if there is a scorer)
 
 VIO_NONE = 'None'
 
@@ -77,12 +115,22 @@ FN_FORMAT = 'game_{num}.{ext}'
 
 FMT_MTENTRY = '[{seqno:0{swidth}}] {mvs}\n'
 FMT_MVTIME = '{mvnum}:{coord}:{time}'
+FMT_MVCPU = ':{user}:{sys}'  # appended to FMT_MVTIME with MoveCpuTimes
+
+# result sinks (see Sinks)
+
+SINK_JSONL = '{name}.jsonl'  # JSON lines, in the match dir
+SINK_ARCHIVE = '{file}.gz'  # compressed copies of the text logs
+SINK_DB = 'dumbarb.sqlite'  # SQLite database of the session (output dir)
+SINK_DB_TIMEOUT = 30  # secs to wait for a database locked by another match
+SINK_DB_VERSION = 1  # schema version of the database (PRAGMA user_version)
 
 # SGF
 
 SGF_AP_VER = DUMBARB + ':' + DUMBVER
 SGF_BEGIN = ('(;GM[1]FF[4]CA[UTF-8]AP[{AP}]RU[{RU}]SZ[{SZ}]KM[{KM}]GN[{GN}]'
-             'PW[{PW}]PB[{PB}]DT[{DT}]EV[{EV}]RE[{RE}]\n')
+             'PW[{PW}]PB[{PB}]DT[{DT}]EV[{EV}]RE[{RE}]{GC}\n')
+SGF_GC = 'GC[{comment}]'
 SGF_MOVE = ';{color}[{x}{y}]C[{comment}]\n'
 SGF_END = ')\n'
 SGF_SUBDIR = 'SGFs'
@@ -90,6 +138,9 @@ SGF_SUBDIR = 'SGFs'
 # stderr logging
 
 ERR_SUBDIR = 'stderr'
+ERR_SEG_LOG = '{name}.log'  # } segmented mode: one log per engine & match,
+ERR_SEG_IDX = '{name}.idx'  # } index with byte range of each game
+FMT_ERRIDX = '{num:08} {start:016} {end:016}\n'  # fixed width (42 bytes)
 
 # engine / desc string naming rules (allowed punctuation, chars, max chars)
 
@@ -112,17 +163,68 @@ ENGINE_BNAM = ('Bad match label/engine name: "{badname}"\n'
                + str(ENGALW_MAXC) + ' characters')
 ENGINE_DIR = 'dir: {dir}'
 ENGINE_CMD = 'cmd: {cmd}'
+ENGINE_CONN = 'connect: {addr}{pooled}'
+ENGINE_REUS = 'reusing the idle process (pid {pid}) of a previous match'
 ENGINE_DIAG = '**** {name} version {version}, speaking GTP {protocol_version}'
 ENGINE_OK = ' - OK'
 ENGINE_FAIL = ' - FAIL'
 ENGINE_MSTA = ('{stats[1]} games ({stats[3]} W, {stats[5]} B); '
                '{stats[0]} won ({stats[2]} W, {stats[4]} B); '
                'max: {stats[6]:.2f}s, tot: {stats[7]:.0f}s')
+ENGINE_ELAG = ('game {num}: stderr reader lagged {count} time(s), up to'
+               ' {secs:.3f}s (engine may have blocked writing stderr)')
+ENGINE_MLAG = '; stderr lags: {count} ({secs:.3f}s)'
+ENGINE_GRES = ('game {num}: CPU user {user:.2f}s, sys {sys:.2f}s in {moves}'
+               ' moves ({pct:.0f}% of {wall:.2f}s); max RSS {rss} KiB')
+ENGINE_MRES = ('CPU user {user:.1f}s, sys {sys:.1f}s ({pct:.0f}% of move'
+               ' time {wall:.1f}s); max RSS {rss} KiB')
+ENGINE_MEMX = ('after game {num}: {what} {kib} KiB over the limit of'
+               ' {limit} KiB')
+ENGINE_MPRO = '; proactive restarts: {}'
+ENGINE_CGRP = 'cgroup: {path} ({settings})'
+ENGINE_NOCG = 'cgroup isolation unavailable ({reason}); {fallback}'
+ENGINE_GCGR = ('game {num}: cgroup CPU {usage:.2f}s (user {user:.2f}s, sys'
+               ' {sys:.2f}s); throttled {nthr}/{nper} periods, {thr:.3f}s')
+ENGINE_CORE = ('core budget share: {threads} threads, cores {cores},'
+               ' NUMA {numa}')
+ENGINE_PRIO = 'priority: {}'
+ENGINE_RSCH = 'GTP reader thread: {}'
+ARB_PRIO = 'arbiter priority: {}'
+ENGINE_LATS = 'GTP latency p99 / timeout: '
+ENGINE_LAT1 = '{cat} {p99:.3f}s / {to:.3f}s (n={n})'
 
 # process communication settings
 
 WAIT_QUIT = 1     # seconds to wait for engine to exit before killing process
 Q_TIMEOUT = 0.5   # seconds to block at a time when waiting for response
+PROC_EXIT_GRACE = 0.2  # secs to let GTP reader get EOF after process exit
+READER_JOIN_TO = 2  # secs to wait for reader threads after process exit
+CONNECT_TRIES = 5  # } attempts to connect to an engine server (Connect),
+CONNECT_WAIT = 2  # } seconds between them
+PROC_STAT = '/proc/{pid}/stat'  # } used to watch engine CPU progress (Linux)
+PROC_CHILDREN = '/proc/{pid}/task/{pid}/children'  # }
+PROC_STATUS = '/proc/{pid}/status'  # } used for peak RSS (Linux)
+PROC_CLEAR_REFS = '/proc/{pid}/clear_refs'  # }
+CGROUP_FS = '/sys/fs/cgroup'  # } cgroup v2 isolation (Linux, delegated
+CGROUP_ARB = 'dumbarb-{pid}'  # } subtree): leaf for dumbarb itself,
+CGROUP_ENG = 'dumbarb-{pid}-{name}-{num}'  # } one per engine instance
+CGROUP_CTRL = ['cpu', 'cpuset', 'memory']  # controllers to enable
+CGROUP_PERIOD = 100000  # cpu.max period (microseconds)
+NUMA_NODES = '/sys/devices/system/node/node[0-9]*'  # for {numa}
+SCHED_POLICIES = {'fifo': 'SCHED_FIFO', 'rr': 'SCHED_RR'}  # ReaderSched
+IO_CLASSES = {'rt': '1', 'be': '2', 'idle': '3'}  # IoPrio: ionice classes
+MEM_SOFT_VMS = 0.9  # fraction of MaxVms triggering a proactive restart
+LATENCY_CMDS = {'list_commands': 'startup',  # } command: latency category,
+                'play': 'play',  # } for latency stats and adaptive
+                'clear_board': 'clear_board',  # } timeouts
+                'final_score': 'final_score'}  # }
+LATENCY_WINDOW = 1000  # latency samples kept per category (sliding window)
+LATENCY_UPDATE = 10  # re-learn adaptive timeout every this many samples
+ERR_CHUNK = 65536  # max bytes to read from engine stderr at a time
+ERR_DRAIN_TO = 2  # seconds to wait for stderr reader to drain the pipe
+ERR_PIPE_SZ = 1048576  # stderr pipe buffer to request (Linux; may be capped)
+ERR_ECHO_RATE = 100  # max stderr lines per second to show on screen
+ERR_ECHO_MAXQ = 10000  # max stderr lines queued for screen; rest are dropped
 
 # NON-CONFIG: do not change
 
@@ -131,14 +233,30 @@ REASON_TIME = 'Time'    # }
 BLACK = 'B'  # } GTP and other stuff rely on these values
 WHITE = 'W'  # }
 CNF_FILE = 'dumbarb-session.config'  # used to recognize a session
+TOURNEY_PRE = '*'  # tournament section names: [* <label>]
+TOURNEY_FORMATS = ('roundrobin', 'gauntlet', 'swiss')
+TOURNEY_KEYS = {'engines', 'format', 'rounds', 'concurrency',
+                'reuseengines'}
+FMT_SHARD = '.shard{}-{}'  # log name suffix with --shard i/n (i, n)
+DIST_RETRIES = 3  # failed attempts at a game before its match is aborted
+DIST_POLL = 1  # seconds between checks for finished session/free games
 INI_KEYSET = {'cmd', 'wkdir', 'pregame', 'prematch', 'postgame', 'postmatch',
-              'quiet', 'logstderr',
+              'quiet', 'logstderr', 'connect',
               'boardsize', 'komi', 'maintime', 'periodtime', 'periodcount',
               'timesys', 'timetolerance', 'enforcetime',
               'movewait', 'matchwait', 'gamewait',
               'numgames', 'scorer', 'consecutivepasses', 'disablesgf',
               'gtptimeout', 'gtpscorerto', 'gtpgenmoveextra',
-              'gtpgenmoveuntimedto', 'gtpinitialtimeout'}
+              'gtpgenmoveuntimedto', 'gtpinitialtimeout', 'hotspare',
+              'segmentedstderr', 'pipelinegenmove', 'cpuhangwindow',
+              'adaptivetimeouts', 'adaptivetimeoutmin', 'learnedtimeouts',
+              'movecputimes', 'maxrss', 'maxvms', 'cgroup', 'cgroupcpumax',
+              'cgroupcpus', 'cgroupmemmax', 'arbiternice', 'readersched',
+              'nice', 'ioprio', 'corebudget', 'stoprule', 'maxmoves',
+              'adjudicatefrom', 'adjudicateevery', 'adjudicatechecks',
+              'adjudicatecmd', 'resignmargin', 'drawmargin', 'sinks',
+              'engines',
+              'format', 'rounds', 'concurrency', 'reuseengines'}
 
 
 class DumbarbException(Exception):
@@ -168,6 +286,9 @@ class GtpProcessError(GtpException):
 class GtpTimeout(GtpException):
     """Engine timed out """
     pass
+class GtpHang(GtpTimeout):
+    """Engine stopped using CPU while it should have been thinking"""
+    pass
 class GtpShutdown(GtpException):
     """Engine is being shut down """
     pass
@@ -208,6 +329,7 @@ class SgfWriter:
         """
         self.dates_iso = datetime.datetime.now().date().isoformat()
         self.result = None
+        self.game_comment = None
         self.blacks_turn = True
         self.moves_string = ''
         self.game_settings = game_settings
@@ -243,7 +365,9 @@ class SgfWriter:
                         PB=self.black_name,
                         DT=self.dates_iso,
                         EV=self.event_name,
-                        RE=self.result)
+                        RE=self.result,
+                        GC=SGF_GC.format(comment=self.game_comment)
+                        if self.game_comment else '')
                 file.write(begin)
                 file.write(self.moves_string)
                 file.write(SGF_END)
@@ -304,14 +428,16 @@ class SgfWriter:
             comment = 'thinking time: {secs}s'
             self.add_move(move, comment=comment.format(secs=mtime))
 
-    def set_result(self, winner, plus_text=None):
+    def set_result(self, winner, plus_text=None, comment=None):
         """Add the game result to the SGF data.
 
         Arguments:
         winner -- one of WHITE, BLACK, RESULT_JIGO, RESULT_NONE, RESULT_OERR
         plus_text -- text after + if W or B won: Time, Resign, or a number
                     indicating score difference (default None)
+        comment -- game comment (GC), e.g. on adjudication (default None)
         """
+        self.game_comment = comment
         if winner == WHITE:
             self.result = 'W+' + plus_text
         elif winner == BLACK:
@@ -364,6 +490,444 @@ class GameSettings:
         """Time system is Japanese byo yomi"""
         return self.time_sys == 3
 
+    def gtp_commands(self):
+        """Return the set of GTP commands players need for these settings"""
+        commands = {'boardsize', 'komi', 'genmove', 'play', 'clear_board',
+                    'quit'}
+        if self.time_sys > 0:
+            commands.add('time_left')
+        if self.time_sys == 3:
+            commands.add('kgs-time_settings')
+        else:
+            commands.add('time_settings')
+        return commands
+
+
+class StopRule:
+    """Decides when a match result is settled: SPRT or LOS threshold
+
+    Results are from the point of view of the first engine of the match.
+    """
+    def __init__(self, spec):
+        """Construct a StopRule object from its config value
+
+        Arguments:
+        spec -- 'sprt <elo0> <elo1> <alpha> <beta>' or
+                'los <confidence> [<min games>]'
+
+        Exceptions: ValueError
+        """
+        args = spec.split()
+        self.kind = args[0].lower() if args else None
+        if self.kind == 'sprt' and len(args) == 5:
+            self.elo0, self.elo1, alpha, beta = (float(x) for x in args[1:])
+            if not (0 < alpha < 1 and 0 < beta < 1 and self.elo0 < self.elo1):
+                raise ValueError('StopRule: need elo0 < elo1 and 0 < alpha,'
+                                 ' beta < 1')
+            self.lower = math.log(beta / (1 - alpha))
+            self.upper = math.log((1 - beta) / alpha)
+        elif self.kind == 'los' and len(args) in (2, 3):
+            self.confidence = float(args[1])
+            self.min_games = int(args[2]) if len(args) == 3 else LOS_MIN_GAMES
+            if not 0.5 < self.confidence < 1:
+                raise ValueError('StopRule: LOS confidence must be between'
+                                 ' 0.5 and 1')
+        else:
+            raise ValueError('StopRule must be "sprt <elo0> <elo1> <alpha>'
+                             ' <beta>" or "los <confidence> [<min games>]"')
+
+    @staticmethod
+    def _expected_score(elo):
+        """Return the expected score for an Elo difference (logistic)"""
+        return 1 / (1 + 10 ** (-elo / 400))
+
+    def llr(self, wins, draws, losses):
+        """Return the log-likelihood ratio of elo1 against elo0
+
+        Uses the normal approximation of the (trinomial) generalized SPRT.
+        """
+        games = wins + draws + losses
+        if not games:
+            return 0.0
+        mean = (wins + draws / 2) / games
+        var = (wins + draws / 4) / games - mean ** 2
+        if var <= 0:
+            return 0.0  # all results equal so far: no information yet
+        score0 = self._expected_score(self.elo0)
+        score1 = self._expected_score(self.elo1)
+        return ((score1 - score0) * (2 * mean - score0 - score1)
+                * games / (2 * var))
+
+    @staticmethod
+    def los(wins, losses):
+        """Return the likelihood of superiority (draws do not count)"""
+        if not wins + losses:
+            return 0.5
+        return 0.5 * (1 + math.erf((wins - losses)
+                                   / math.sqrt(2 * (wins + losses))))
+
+    def check(self, wins, draws, losses, names):
+        """Return (stop, message): whether the match is settled, and why
+
+        Arguments:
+        wins, draws, losses -- results of the first engine so far
+        names -- the names of the first and second engine
+        """
+        counts = {'n': wins + draws + losses, 'w': wins, 'd': draws,
+                  'l': losses}
+        if self.kind == 'sprt':
+            llr = self.llr(wins, draws, losses)
+            msg = FMT_SPRT.format(elo0=self.elo0, elo1=self.elo1, llr=llr,
+                                  lo=self.lower, hi=self.upper, **counts)
+            if llr >= self.upper:
+                return True, msg + ': H1 ({:g} Elo) accepted'.format(self.elo1)
+            if llr <= self.lower:
+                return True, msg + ': H0 ({:g} Elo) accepted'.format(self.elo0)
+            return False, msg + ': inconclusive'
+        los = self.los(wins, losses)
+        if los < 0.5:
+            names, los = names[::-1], 1 - los
+        msg = FMT_LOS.format(name1=names[0], name2=names[1], los=los,
+                             conf=self.confidence, **counts)
+        if los >= self.confidence and counts['n'] >= self.min_games:
+            return True, msg
+        return False, msg + ': inconclusive'
+
+
+class LatencyStats:
+    """Response latencies of a GTP command category (sliding window)"""
+    def __init__(self, window=LATENCY_WINDOW):
+        """Construct a LatencyStats object
+
+        Arguments:
+        window -- max number of (most recent) samples kept
+        """
+        self.samples = collections.deque(maxlen=window)
+        self.count = 0  # all samples ever added
+
+    def add(self, secs):
+        """Add a latency sample (seconds)"""
+        self.samples.append(secs)
+        self.count += 1
+
+    def quantile(self, q):
+        """Return the q-quantile (nearest rank) of the samples, or None"""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class EngineCgroup:
+    """A cgroup v2 holding an engine's process tree (Linux)
+
+    Needs a delegated cgroup subtree, e.g. running dumbarb with
+    systemd-run --user --scope -p Delegate=yes. On first use, dumbarb moves
+    itself into a leaf cgroup (CGROUP_ARB) and enables the CGROUP_CTRL
+    controllers for its own cgroup's children; engine cgroups are created
+    next to that leaf.
+    """
+    base = None  # the delegated cgroup (dir) once set up
+    error = None  # why setup failed, if it did
+    serial = itertools.count(1)  # engine instances (concurrent matches)
+
+    @classmethod
+    def setup(cls):
+        """Set up the delegated subtree (once); return success"""
+        if cls.base or cls.error:
+            return cls.base is not None
+        try:
+            with open('/proc/self/cgroup') as f:
+                paths = [line[3:].strip() for line in f
+                         if line.startswith('0::')]
+            if not paths:
+                raise OSError('no cgroup v2 hierarchy')
+            base = CGROUP_FS + paths[0].rstrip('/')
+            with open(os.path.join(base, 'cgroup.controllers')) as f:
+                available = f.read().split()
+            arb = os.path.join(base, CGROUP_ARB.format(pid=os.getpid()))
+            os.makedirs(arb, exist_ok=True)
+            with open(os.path.join(arb, 'cgroup.procs'), 'w') as f:
+                f.write(str(os.getpid()))
+            with open(os.path.join(base, 'cgroup.subtree_control'),
+                      'w') as f:
+                f.write(' '.join('+' + ctrl for ctrl in CGROUP_CTRL
+                                 if ctrl in available))
+        except OSError as e:
+            cls.error = str(e)
+            return False
+        cls.base = base
+        return True
+
+    def __init__(self, name, cpu_max=0, cpus=None, mem_max=0):
+        """Create the cgroup of an engine instance, apply the limits
+
+        The same engine playing in several concurrent matches gets a
+        cgroup (and limits) per match.
+
+        Arguments:
+        name -- the engine name
+        cpu_max -- CPU limit in cores (fraction; default 0: none)
+        cpus -- cpuset.cpus list, e.g. '0-3,8' (default None: any)
+        mem_max -- memory limit in MiB (default 0: none)
+
+        Exceptions: OSError
+        """
+        self.path = os.path.join(self.base, CGROUP_ENG.format(
+                pid=os.getpid(), name=name, num=next(self.serial)))
+        os.makedirs(self.path, exist_ok=True)
+        self.settings = []
+        if cpu_max:
+            self._write('cpu.max', '{} {}'.format(
+                    int(cpu_max * CGROUP_PERIOD), CGROUP_PERIOD))
+        if cpus:
+            self._write('cpuset.cpus', cpus)
+        if mem_max:
+            self._write('memory.max', str(int(mem_max * 1048576)))
+
+    def _write(self, filename, value):
+        """Write value to a cgroup file, remember it as a setting"""
+        with open(os.path.join(self.path, filename), 'w') as f:
+            f.write(value)
+        self.settings.append('{}={}'.format(filename, value))
+
+    def add(self, pid):
+        """Move a process (and its future children) into the cgroup"""
+        with open(os.path.join(self.path, 'cgroup.procs'), 'w') as f:
+            f.write(str(pid))
+
+    def cpu_stat(self):
+        """Return the cpu.stat counters as a dict (empty if unreadable)"""
+        try:
+            with open(os.path.join(self.path, 'cpu.stat')) as f:
+                return {key: int(value) for key, value
+                        in (line.split() for line in f)}
+        except (OSError, ValueError):
+            return {}
+
+    def remove(self):
+        """Remove the cgroup (fails quietly if processes remain in it)"""
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            pass
+
+
+class GtpResponses:
+    """Assembles GTP responses from the lines an engine writes"""
+    def __init__(self):
+        self.bar = bytearray()
+
+    def feed(self, byteline):
+        """Take a line (bytes, with newline); return a response or None
+
+        Removes CRs per GTP2, waits for termination with two newlines then
+        returns the response decoded into a right-stripped string.
+        """
+        byteline = byteline.replace(b'\r', b'')
+        if byteline != b'\n' or not self.bar:
+            self.bar.extend(byteline)
+            return None
+        response = self.bar.decode().rstrip()
+        self.bar = bytearray()
+        return response
+
+
+class GtpConnection:
+    """A connection to a GTP engine server, standing in for an engine process
+
+    Has the parts of a Popen object that ManagedEngine uses (pid, poll,
+    wait, kill); pid is None, as there is no local process. Commands are
+    sent with write(); responses are read by the connection's own reader
+    thread into resp_queue, so that the connection can outlive the engine
+    using it and be pooled (see GtpPool). The reader reports to the engine
+    currently using the connection (owner).
+    """
+    def __init__(self, address, owner, timeout=None):
+        """Connect and start the reader thread
+
+        Arguments:
+        address -- host:port (TCP) or the path of a Unix socket
+        owner -- the ManagedEngine using the connection
+        timeout -- max seconds to wait for the connection (default None)
+
+        Exceptions: OSError, ValueError (bad address)
+        """
+        self.address = address
+        self.owner = owner
+        self.pid = None
+        self.sock = dist_socket(address, timeout=timeout)
+        if self.sock.family != socket.AF_UNIX:
+            # commands are small: do not let Nagle delay them
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+        self.resp_queue = queue.Queue()
+        self.gtp_down = threading.Event()
+        self.thread = threading.Thread(name='GTP-rdr-conn',
+                                       target=self._r_gtp_loop,
+                                       args=(owner.reader_sched,),
+                                       daemon=True)
+        self.thread.start()
+
+    def _r_gtp_loop(self, sched):
+        """Thread: read GTP responses until the connection is closed"""
+        if sched:
+            self.owner.reader_sched_result = set_thread_sched(*sched)
+        read_gtp(self.stream, self.resp_queue, self.gtp_down,
+                 lambda: self.owner)
+
+    def write(self, data):
+        """Send data (all of it)"""
+        self.sock.sendall(data)
+
+    def is_idle(self):
+        """Return whether the connection is up with no unread responses"""
+        return not self.gtp_down.is_set() and self.resp_queue.empty()
+
+    def poll(self):
+        """Return None while the connection is up, else 0"""
+        return 0 if self.gtp_down.is_set() else None
+
+    def wait(self, timeout=None):
+        """Wait for the connection to go down, return 0
+
+        Exceptions: subprocess.TimeoutExpired
+        """
+        if not self.gtp_down.wait(timeout):
+            raise subprocess.TimeoutExpired(self.address, timeout)
+        return 0
+
+    def kill(self):
+        """Close the connection"""
+        self.close()
+
+    def close(self, timeout=READER_JOIN_TO):
+        """Close the connection, wait for the reader thread to finish
+
+        Arguments:
+        timeout -- max seconds to wait for the reader (default READER_JOIN_TO)
+        """
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # reader gets EOF
+        except OSError:
+            pass
+        self.thread.join(timeout)
+        self.stream.close()
+        self.sock.close()
+
+
+class GtpPool:
+    """Idle connections to engine servers, kept for reuse
+
+    Connections are pooled per engine name and server address, so an engine
+    that plays in several matches (or is restarted proactively) does not
+    need a new connection, and the server does not need to start a new
+    engine, each time. Concurrent games get connections of their own.
+    """
+    idle = {}  # (name, address): [GtpConnection, ...]
+    lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls, engine, timeout=None):
+        """Return (a connection for engine, whether it was pooled)
+
+        Pooled connections that went down (or got unsolicited output) while
+        idle are closed. A new connection is made if none is left.
+
+        Arguments:
+        engine -- the ManagedEngine (uses engine.name and engine.connect)
+        timeout -- max seconds to wait for a new connection (default None)
+
+        Exceptions: OSError, ValueError (bad address)
+        """
+        key = (engine.name, engine.connect)
+        while True:
+            with cls.lock:
+                conns = cls.idle.get(key)
+                conn = conns.pop() if conns else None
+            if conn is None:
+                return GtpConnection(engine.connect, engine, timeout), False
+            if conn.is_idle():
+                conn.owner = engine
+                return conn, True
+            conn.close()
+
+    @classmethod
+    def release(cls, engine, conn):
+        """Put engine's connection back into the pool, or close it if not idle
+
+        Returns whether the connection was pooled.
+        """
+        if not conn.is_idle():
+            conn.close()
+            return False
+        with cls.lock:
+            cls.idle.setdefault((engine.name, engine.connect), []).append(conn)
+        return True
+
+
+class EnginePool:
+    """Idle engine processes of a tournament, kept for the next match
+
+    An engine that ends a match normally is parked here instead of being
+    shut down; the same engine (name and interpolated command line) in a
+    later match adopts the process (see ManagedEngine.adopt_process) instead
+    of starting a new one. The tournament shuts down the parked engines
+    that the matches it starts next do not use (see retain), so an idle
+    engine never waits through a match. Connect engines (see GtpPool) and
+    engines writing stderr to the match dir directly are not parked.
+    """
+    def __init__(self):
+        self.idle = {}  # (name, command line): ManagedEngine
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(engine):
+        return engine.name, engine._cmd_line_interpolate()
+
+    def park(self, engine):
+        """Keep engine's running process for reuse; return whether it was kept
+
+        Not kept if the engine is down or another one is parked in its place
+        (concurrent matches).
+
+        Arguments:
+        engine -- the ManagedEngine, done with its match
+        """
+        if (engine.connect or engine.err_direct or engine.is_spare
+                or not engine.popen or engine.popen.poll() is not None
+                or engine.gtp_down.is_set() or engine.quit_sent):
+            return False
+        key = self._key(engine)
+        with self.lock:
+            if key in self.idle:
+                return False
+            self.idle[key] = engine
+        return True
+
+    def take(self, engine):
+        """Return the parked engine matching engine (and unpark it), or None
+
+        Arguments:
+        engine -- the ManagedEngine about to start
+
+        Exceptions: PermanentEngineError (bad command line)
+        """
+        key = self._key(engine)
+        with self.lock:
+            return self.idle.pop(key, None)
+
+    def retain(self, names):
+        """Shut down the parked engines whose name is not in names"""
+        with self.lock:
+            drop = [key for key in self.idle if key[0] not in names]
+            engines = [self.idle.pop(key) for key in drop]
+        fan_out(ManagedEngine.close_idle, engines)
+
+    def close(self):
+        """Shut down all parked engines"""
+        self.retain(())
+
 
 class GtpEngine:
     """Talks with a GTP engine using streams, multi-threaded."""
@@ -395,103 +959,369 @@ class GtpEngine:
         self.thread_eout = None
         self.thread_eerr = None
         self.resp_queue = None
+        self.last_resp_time = None  # when the last response was read
+        self.last_send_time = None  # when the last command was sent
+        self.adaptive_to = 0  # if set, timeout = adaptive_to * p99 latency
+        self.adaptive_to_min = 1  # floor for adaptive timeouts
+        self.latency = {}  # latency category: LatencyStats
+        self.learned_to = {}  # latency category: learned timeout (seconds)
+        self.reader_sched = None  # (policy, priority) for the GTP reader
+        self.reader_sched_result = None  # whether it was granted
         self.err_file = None
+        self.err_index = None
+        self.err_seg_start = None
+        self.err_direct = False  # err_file written directly by engine process
         self.err_lock = threading.Lock()
+        self.err_owner = self  # engine whose err_file gets our stderr
+        self.err_wakeup = None  # pipe to wake the stderr reader (POSIX)
+        self.err_drained = threading.Event()
+        self.err_line_buf = b''
+        self.err_pipe_size = None  # known on Linux only
+        self.err_last_read = None
+        self.err_lag_count = 0  # } times stderr pipe found full, time since
+        self.err_lag_time = 0.0  # } last read (the engine may have blocked)
+        self.err_lag_lock = threading.Lock()  # guards err_lag_*
+        self.thread_echo = None
+        self.err_echo_q = None
+        self.err_echo_stop = threading.Event()
+        self.err_echo_dropped = 0
         self.gtp_down = threading.Event()
+        self.restarts = 0
+        self.last_restart_rq = None
 
     def _start_readers(self):
-        """Initialize and run reader threads, response queue"""
+        """Initialize and run reader threads, response queue
+
+        Each thread gets its own queue and events, so a thread that outlives
+        its process (see _stop_readers) cannot disturb a new one.
+        """
         assert self.thread_eout is None and self.thread_eerr is None
-        self.gtp_down.clear()
+        self.gtp_down = threading.Event()
         if self.eout:
             self.resp_queue = queue.Queue()
             self.thread_eout = threading.Thread(
                     name='GTP-rdr',
                     target=self._r_gtp_loop,
+                    args=(self.resp_queue, self.gtp_down),
                     daemon=True)
             self.thread_eout.start()
         if self.eerr:
+            if not sys.platform.startswith('win'):
+                self.err_wakeup = os.pipe()
+            if sys.platform.startswith('linux'):
+                self._enlarge_err_pipe()
+            self.err_drained = threading.Event()
+            self.err_echo_stop = threading.Event()
+            if not self.suppress_err:
+                self.err_echo_q = queue.Queue(maxsize=ERR_ECHO_MAXQ)
+                self.thread_echo = threading.Thread(
+                        name='err-echo',
+                        target=self._r_err_echo,
+                        args=(self.err_echo_q, self.err_echo_stop),
+                        daemon=True)
+                self.thread_echo.start()
             self.thread_eerr = threading.Thread(
                     name='err-rdr',
                     target=self._r_err_loop,
+                    args=(self.err_drained, self.err_echo_stop),
                     daemon=True)
             self.thread_eerr.start()
 
-    def _stop_readers(self):
-        """Join the threads for shutdown; close any open stderr logfile"""
+    def _stop_readers(self, timeout=None):
+        """Join the threads for shutdown (stderr logfile stays open)
+
+        Threads still running after timeout (e.g. because a child of the
+        engine holds its streams open) are abandoned with a warning.
+
+        Arguments:
+        timeout -- max seconds to wait for each thread (default None: forever)
+        """
         if self.show_debug:
             self._engerr('Joining read threads...')
-        self.set_err_file()
-        if self.thread_eout:
-            self.thread_eout.join()
-            self.thread_eout = None
-        if self.thread_eerr:
-            self.thread_eerr.join()
-            self.thread_eerr = None
-
-    def _r_gtp_loop(self):
+        self._join_reader(self.thread_eout, timeout)
+        self.thread_eout = None
+        err_joined = self._join_reader(self.thread_eerr, timeout)
+        self.thread_eerr = None
+        self._join_reader(self.thread_echo, timeout)
+        self.thread_echo = None
+        if self.err_wakeup and err_joined:
+            for fd in self.err_wakeup:
+                os.close(fd)
+        self.err_wakeup = None
+
+    def _join_reader(self, thread, timeout):
+        """Join a reader thread (if any) within timeout; return success"""
+        if not thread:
+            return True
+        thread.join(timeout)
+        if thread.is_alive():
+            msg = ('{} thread still blocked (stream held open by another'
+                   ' process?); abandoning it')
+            self._engerr(msg.format(thread.name))
+            return False
+        return True
+
+    def _r_gtp_loop(self, resp_queue, gtp_down):
         """Thread: read GTP and put into queue, signal when stream down
 
-        Removes CRs per GTP2, waits for termination with two newlines then
-        decodes into a right-stripped string and puts it in the response queue.
-        Sets self.gtp_down when it can no longer read.
+        See read_gtp.
+
+        Arguments:
+        resp_queue -- the response queue
+        gtp_down -- the event to set on EOF/error
         """
-        bar = bytearray()
-        try:
-            for byteline in self.eout:
-                byteline = byteline.replace(b'\r', b'')
-                if byteline != b'\n' or not bar:
-                    bar.extend(byteline)
-                    continue
-                response = bar.decode().rstrip()
-                if self.gtp_debug:
-                    self._engerr('Received: {}'.format(response))
-                self.resp_queue.put(response)
-                bar = bytearray()
-            if self.show_debug:
-                self._engerr('GTP -EOF-')
-            self.gtp_down.set()
-        except OSError as e:
-            self._engerr('GTP read error: {1}'.format(e))
-            self.gtp_down.set()
+        if self.reader_sched:
+            self.reader_sched_result = set_thread_sched(*self.reader_sched)
+        read_gtp(self.eout, resp_queue, gtp_down, lambda: self)
 
-    def _r_err_loop(self):
+    def _r_err_loop(self, drained, echo_stop):
         """Thread: Read engine stderr; display it, log to file, or both/none
 
-        Writing/changing the self.err_file is sync'd with a lock.
+        Writing/changing the self.err_file is sync'd with a lock. Output goes
+        to the err_file of self.err_owner, which changes if another engine
+        adopts this one's process (see ManagedEngine.adopt_process).
+
+        On POSIX, also watch self.err_wakeup: when woken by drain_err(), read
+        whatever is in the pipe without blocking, then set err_drained.
+
+        Arguments:
+        drained -- the err_drained event (also set when done)
+        echo_stop -- the event stopping the echo thread (set when done)
         """
         try:
-            for byteline in self.eerr:
-                if not self.suppress_err:
-                    self._engerr(byteline.decode().rstrip(), prefix='')
-                with self.err_lock:
-                    if self.err_file:
-                        self.err_file.write(byteline)
+            if self.err_wakeup is None:
+                for byteline in self.eerr:
+                    self._handle_err_bytes(byteline)
+            else:
+                self._r_err_select(drained)
+            if self.err_line_buf:
+                self._echo_err_line(self.err_line_buf)
+                self.err_line_buf = b''
             if self.show_debug:
                 self._engerr('stderr -EOF-')
         except OSError as e:
-            self._engerr('stderr read error: {1}'.format(e))
+            self._engerr('stderr read error: {}'.format(e))
+        finally:
+            drained.set()
+            echo_stop.set()
+
+    def _r_err_select(self, drained):
+        """Read stderr in chunks until EOF, serving drain requests
+
+        Arguments:
+        drained -- the event to set after serving a drain request
+        """
+        err_fd = self.eerr.fileno()
+        wake_fd = self.err_wakeup[0]
+        while True:
+            ready = select.select([err_fd, wake_fd], [], [])[0]
+            if err_fd in ready:
+                self._check_err_lag(err_fd)
+                chunk = os.read(err_fd, ERR_CHUNK)
+                self.err_last_read = time.monotonic()
+                if not chunk:
+                    return
+                self._handle_err_bytes(chunk)
+            if wake_fd in ready:
+                os.read(wake_fd, ERR_CHUNK)
+                while select.select([err_fd], [], [], 0)[0]:
+                    chunk = os.read(err_fd, ERR_CHUNK)
+                    if not chunk:
+                        return
+                    self._handle_err_bytes(chunk)
+                drained.set()
+
+    def _handle_err_bytes(self, data):
+        """Log stderr bytes to the owner's err_file, display complete lines
+
+        Arguments:
+        data -- bytes read from engine stderr
+        """
+        owner = self.err_owner
+        with owner.err_lock:
+            if owner.err_file:
+                owner.err_file.write(data)
+        if self.err_echo_q is None:
+            return
+        lines = (self.err_line_buf + data).split(b'\n')
+        self.err_line_buf = lines.pop()
+        for byteline in lines:
+            self._echo_err_line(byteline)
+
+    def _echo_err_line(self, byteline):
+        """Queue a stderr line for display without blocking (drop if full)
+
+        Arguments:
+        byteline -- the line (bytes)
+        """
+        try:
+            self.err_echo_q.put_nowait(byteline)
+        except queue.Full:
+            self.err_echo_dropped += 1
+
+    def _r_err_echo(self, echo_q, echo_stop):
+        """Thread: display queued stderr lines, at most ERR_ECHO_RATE/second
+
+        Displaying is kept off the stderr reader thread, so a slow terminal
+        cannot fill the engine's stderr pipe and block the engine. Lines
+        dropped because the queue was full are reported as a count.
+
+        Arguments:
+        echo_q -- the queue of lines to display
+        echo_stop -- event signalling no more lines will be queued
+        """
+        window_start = time.monotonic()
+        shown = 0
+        reported = 0
+        while True:
+            try:
+                byteline = echo_q.get(timeout=Q_TIMEOUT)
+            except queue.Empty:
+                if echo_stop.is_set():
+                    break
+                continue
+            now = time.monotonic()
+            if now - window_start >= 1:
+                window_start, shown = now, 0
+            elif shown >= ERR_ECHO_RATE and not echo_stop.is_set():
+                time.sleep(window_start + 1 - now)
+                window_start, shown = time.monotonic(), 0
+            dropped = self.err_echo_dropped
+            if dropped > reported:
+                msg = '[{} stderr lines not shown]'
+                self._engerr(msg.format(dropped - reported))
+                reported = dropped
+            self._engerr(byteline.decode(errors='replace').rstrip(),
+                         prefix='')
+            shown += 1
+        if self.err_echo_dropped > reported:
+            msg = '[{} stderr lines not shown]'
+            self._engerr(msg.format(self.err_echo_dropped - reported))
+
+    def _enlarge_err_pipe(self):
+        """Try to enlarge the stderr pipe buffer to ERR_PIPE_SZ (Linux)
+
+        Sets err_pipe_size to the resulting size, which enables lag counting.
+        """
+        err_fd = self.eerr.fileno()
+        try:
+            fcntl.fcntl(err_fd, getattr(fcntl, 'F_SETPIPE_SZ', 1031),
+                        ERR_PIPE_SZ)
+        except OSError:
+            pass  # above /proc/sys/fs/pipe-max-size; keep what we have
+        try:
+            self.err_pipe_size = fcntl.fcntl(
+                    err_fd, getattr(fcntl, 'F_GETPIPE_SZ', 1032))
+        except OSError:
+            self.err_pipe_size = None
+
+    def _check_err_lag(self, err_fd):
+        """Count a lag if the stderr pipe is full, i.e. the reader fell behind
+
+        The time since the last read is added to the owner's err_lag_time
+        (an upper bound for the time the engine was blocked writing).
+
+        Arguments:
+        err_fd -- the stderr pipe file descriptor
+        """
+        if not self.err_pipe_size or self.err_last_read is None:
+            return
+        buf = fcntl.ioctl(err_fd, termios.FIONREAD, struct.pack('i', 0))
+        if struct.unpack('i', buf)[0] >= self.err_pipe_size:
+            owner = self.err_owner
+            with owner.err_lag_lock:
+                owner.err_lag_count += 1
+                owner.err_lag_time += time.monotonic() - self.err_last_read
+
+    def drain_err(self, timeout=ERR_DRAIN_TO):
+        """Wait until stderr written so far has been logged; return success
+
+        Wakes the stderr reader thread, which reads everything currently in
+        the pipe before acknowledging, so that the err_file can be switched
+        at a game boundary without a pause. Only supported on POSIX (returns
+        True immediately elsewhere; GameWait should be used instead).
+
+        Arguments:
+        timeout -- max seconds to wait for the reader (default ERR_DRAIN_TO)
+        """
+        if not self.thread_eerr or not self.thread_eerr.is_alive():
+            return True
+        if self.err_wakeup is None:
+            return True
+        self.err_drained.clear()
+        os.write(self.err_wakeup[1], b'd')
+        return self.err_drained.wait(timeout)
 
     def _raw_recv_response(self, timeout):
         """Dequeue a response within timeout, also checking for gtp_down event
 
+        Sets self.last_resp_time to the time the response was read. A
+        GtpProcessError found in the queue (put there when the engine process
+        exits, see ManagedEngine) is raised.
+
         Arguments:
         timeout -- timeout before raising GtpTimeout
 
-        Exceptions: GtpTimeout, GtpShutdown
+        Exceptions: GtpTimeout, GtpShutdown, GtpProcessError, GtpHang
         """
         begin = datetime.datetime.utcnow()
         retries = 1
         while (datetime.datetime.utcnow() - begin).total_seconds() < timeout:
             try:
-                return self.resp_queue.get(block=True, timeout=Q_TIMEOUT)
+                response, self.last_resp_time = self.resp_queue.get(
+                        block=True, timeout=Q_TIMEOUT)
+                if isinstance(response, GtpProcessError):
+                    raise response
+                return response
             except queue.Empty:
                 if self.gtp_down.is_set():
                     retries -= 1
                 if retries <= 0:
                     raise GtpShutdown('GTP disconnected')
+                self._check_progress()
         raise GtpTimeout('Timeout exceeded ({})'.format(timeout))
 
+    def _check_progress(self):
+        """Called every Q_TIMEOUT while waiting; may raise a GtpException
+
+        Does nothing here; see ManagedEngine.
+        """
+        pass
+
+    def _count_restart(self, severity):
+        """Count a restart, return its severity; raise PermanentEngineError
+        if there were too many
+
+        Restarts in quick succession count more (their severity is raised).
+
+        Arguments:
+        severity -- by how much to increment the restart counter
+        """
+        utcnow = datetime.datetime.utcnow()
+        if self.last_restart_rq:
+            s_since_last = (utcnow - self.last_restart_rq).total_seconds()
+            if s_since_last < 20:
+                if self.show_debug:
+                    msg = 'Restarting too often, too fast, about to give up.'
+                    self._engerr(msg)
+                severity += 2
+            elif s_since_last < 180:
+                if self.show_debug:
+                    msg = 'Restarting fairly often, will give up soon.'
+                    self._engerr(msg)
+                severity += 1
+            elif s_since_last > 600:
+                self.restarts = max(ENGINE_RESTART // 2, self.restarts)
+            elif s_since_last > 1800:
+                self.restarts = ENGINE_RESTART
+        self.last_restart_rq = utcnow
+        self.restarts += severity
+        if self.restarts > ENGINE_RESTART:
+            msg = ('Engine restarted too quickly too many times'
+                   ' (or with high severity level).')
+            raise PermanentEngineError(self.name, msg)
+        return severity
+
     def _raw_send_command(self, command):
         """Encode, terminate and send a GTP command
 
@@ -505,6 +1335,7 @@ class GtpEngine:
         """
         if self.gtp_debug:
             self._engerr(' Sending: {}'.format(command))
+        self.last_send_time = datetime.datetime.utcnow()
         try:
             self.ein.write(command.rstrip().encode() + b'\n')
         except OSError as e:
@@ -532,7 +1363,8 @@ class GtpEngine:
         This method acquires err_lock, closes any previously opened err_file,
         opens the new one (for binary writing), and sets it be the new err_file
         before releasing the lock. To close the currently open err_file,
-        (if any), call with no args.
+        (if any), call with no args. Any open segment index (see
+        begin_err_segment) is closed as well.
 
         Arguments:
 
@@ -543,6 +1375,9 @@ class GtpEngine:
                 if self.err_file:
                     self.err_file.close()
                     self.err_file = None
+                if self.err_index:
+                    self.err_index.close()
+                    self.err_index = None
                 if filename:
                     self.err_file = open(filename, 'wb')
             finally:
@@ -551,6 +1386,55 @@ class GtpEngine:
             msg = '[{}] Could not acquire err_lock! Something is very wrong!'
             raise AllAbort(msg.format(self.name))
 
+    def begin_err_segment(self, filename, index_filename):
+        """Start a game's segment in a stderr logfile shared by all games
+
+        Opens filename for appending (and index_filename for recording the
+        segment's byte range) unless it is already the err_file, then notes
+        the current offset as the start of the segment.
+
+        Arguments:
+        filename -- stderr logfile for the whole match
+        index_filename -- index file for the logfile
+        """
+        if not (self.err_file and self.err_file.name == filename):
+            self.set_err_file()
+            with self.err_lock:
+                self.err_file = open(filename, 'ab')
+        with self.err_lock:
+            if not self.err_index:
+                self.err_index = open(index_filename, 'a')
+            self.err_seg_start = self._err_offset()
+
+    def _err_offset(self):
+        """Return the current end of err_file (call with err_lock held)
+
+        If the engine process writes to the file directly, the file size is
+        used, as our own file position does not move.
+        """
+        if self.err_direct:
+            return os.fstat(self.err_file.fileno()).st_size
+        self.err_file.flush()
+        return self.err_file.tell()
+
+    def end_err_segment(self, game_num):
+        """Record the byte range of the current segment in the index
+
+        Should be called after drain_err(), so the segment is complete (not
+        needed if the engine writes to the file directly).
+
+        Arguments:
+        game_num -- the game number in the match
+        """
+        with self.err_lock:
+            if not self.err_file or self.err_seg_start is None:
+                return
+            end = self._err_offset()
+        self.err_index.write(FMT_ERRIDX.format(
+                num=game_num, start=self.err_seg_start, end=end))
+        self.err_index.flush()
+        self.err_seg_start = None
+
     def quit(self):
         """Send the quit command to the engine"""
         self.send_command('quit')
@@ -584,26 +1468,8 @@ class GtpEngine:
         if timeout is None:
             timeout = self.gtp_timeout
         self._raw_send_command(command)
-        try:
-            response = self._raw_recv_response(timeout=timeout)
-        except GtpTimeout:
-            msg = '[{name}] GTP timeout({to}), command: {cmd}'
-            f_msg = msg.format(name=self.name, to=timeout, cmd=command)
-            raise GtpTimeout(f_msg) from None
-        if response.lower() == '? unknown command':
-            msg = '[{name}] unknown command: {cmd}'
-            raise GtpUnknownCommand(msg.format(name=self.name, cmd=command))
-        if response.lower() == '? illegal move':
-            msg = '[{name}] GTP engine protests: "{resp}" (cmd: "{cmd}")'
-            f_msg = msg.format(name=self.name, resp=response, cmd=command)
-            raise GtpIllegalMove(f_msg)
-        if response != '=':
-            if usercmd:
-                return response
-            msg = '[{name}] GTP unexpected response: "{resp}" (cmd: "{cmd}")'
-            f_msg = msg.format(name=self.name, resp=response, cmd=command)
-            raise GtpResponseError(f_msg)
-        return None
+        response = self._recv_response_for(command, timeout)
+        return self._check_empty_response(command, response, usercmd)
 
     def get_response_for(self, command, timeout=None):
         """Send a GTP command and return its output
@@ -619,26 +1485,108 @@ class GtpEngine:
         if timeout is None:
             timeout = self.gtp_timeout
         self._raw_send_command(command)
+        response = self._recv_response_for(command, timeout)
+        return self._check_output_response(command, response)
+
+    def _recv_response_for(self, command, timeout):
+        """Receive the response to command (sent already) within timeout
+
+        For commands in LATENCY_CMDS, the latency is recorded and timeout
+        serves as the ceiling of the adaptive timeout (if enabled).
+
+        Exceptions: GtpTimeout (naming the command), GtpShutdown, GtpHang
+        """
+        category = LATENCY_CMDS.get(''.join(command.split()[:1]))
+        timeout = self.adapt_timeout(category, timeout)
         try:
             response = self._raw_recv_response(timeout=timeout)
+        except GtpHang:
+            raise
         except GtpTimeout:
             msg = '[{name}] GTP timeout({to}), command: {cmd}'
             f_msg = msg.format(name=self.name, to=timeout, cmd=command)
             raise GtpTimeout(f_msg) from None
-        if response.lower() == '? cannot score':
-            msg = '[{name}] GTP scorer problem: "{resp}" (cmd: "{cmd}")'
-            f_msg = msg.format(name=self.name, resp=response, cmd=command)
-            raise GtpCannotScore(f_msg)
-        if response.lower() == '? unknown command':
-            msg = '[{name}] unknown GTP command: {cmd}'
-            raise GtpUnknownCommand(msg.format(name=self.name, cmd=command))
-        if response[:2] != '= ':
-            msg = '[{name}] GTP response error: "{resp}" (cmd: "{cmd}")'
-            f_msg = msg.format(name=self.name, resp=response, cmd=command)
-            raise GtpResponseError(f_msg)
-        return response[2:]
+        if category:
+            self._record_latency(category)
+        return response
 
-    def clear_board(self):
+    def adapt_timeout(self, category, ceiling):
+        """Return the timeout to use for a latency category
+
+        This is the learned timeout (see _record_latency), limited to
+        adaptive_to_min..ceiling, or ceiling if nothing has been learned or
+        adaptive timeouts are off.
+
+        Arguments:
+        category -- latency category (see LATENCY_CMDS) or None
+        ceiling -- the configured timeout
+        """
+        learned = self.learned_to.get(category)
+        if not self.adaptive_to or learned is None:
+            return ceiling
+        return min(max(learned, self.adaptive_to_min), ceiling)
+
+    def _record_latency(self, category):
+        """Record the latency of the last response, re-learn its timeout
+
+        Every LATENCY_UPDATE samples, the learned timeout of the category is
+        set to adaptive_to times the p99 latency (if adaptive_to is set).
+
+        Arguments:
+        category -- latency category (see LATENCY_CMDS)
+        """
+        stats = self.latency.setdefault(category, LatencyStats())
+        latency = self.last_resp_time - self.last_send_time
+        stats.add(latency.total_seconds())
+        if self.adaptive_to and stats.count % LATENCY_UPDATE == 0:
+            learned = round(self.adaptive_to * stats.quantile(0.99), 3)
+            if self.show_debug and learned != self.learned_to.get(category):
+                msg = 'learned {cat} timeout: {to:.3f}s'
+                self._engerr(msg.format(cat=category, to=learned))
+            self.learned_to[category] = learned
+
+    def _check_empty_response(self, command, response, usercmd=False):
+        """Check the response to a command that produces no output
+
+        Returns None, or the response if usercmd is True and it is not an
+        error. See send_command.
+
+        Exceptions: GtpIllegalMove, GtpResponseError, GtpUnknownCommand
+        """
+        if response.lower() == '? unknown command':
+            msg = '[{name}] unknown command: {cmd}'
+            raise GtpUnknownCommand(msg.format(name=self.name, cmd=command))
+        if response.lower() == '? illegal move':
+            msg = '[{name}] GTP engine protests: "{resp}" (cmd: "{cmd}")'
+            f_msg = msg.format(name=self.name, resp=response, cmd=command)
+            raise GtpIllegalMove(f_msg)
+        if response != '=':
+            if usercmd:
+                return response
+            msg = '[{name}] GTP unexpected response: "{resp}" (cmd: "{cmd}")'
+            f_msg = msg.format(name=self.name, resp=response, cmd=command)
+            raise GtpResponseError(f_msg)
+        return None
+
+    def _check_output_response(self, command, response):
+        """Check the response to a command that produces output, return it
+
+        Exceptions: GtpCannotScore, GtpResponseError, GtpUnknownCommand
+        """
+        if response.lower() == '? cannot score':
+            msg = '[{name}] GTP scorer problem: "{resp}" (cmd: "{cmd}")'
+            f_msg = msg.format(name=self.name, resp=response, cmd=command)
+            raise GtpCannotScore(f_msg)
+        if response.lower() == '? unknown command':
+            msg = '[{name}] unknown GTP command: {cmd}'
+            raise GtpUnknownCommand(msg.format(name=self.name, cmd=command))
+        if response[:2] != '= ':
+            msg = '[{name}] GTP response error: "{resp}" (cmd: "{cmd}")'
+            f_msg = msg.format(name=self.name, resp=response, cmd=command)
+            raise GtpResponseError(f_msg)
+        return response[2:]
+
+    def clear_board(self):
         """Clear the engine's board"""
         self.send_command('clear_board')
 
@@ -678,6 +1626,38 @@ class GtpEngine:
         """
         return self.get_response_for('final_score', timeout=self.gtp_scorer_to)
 
+    def time_left_and_move(self, time_left, timeout):
+        """Send time_left and genmove in one write; return (move, delta)
+
+        The responses are read in order, errors being attributed to the right
+        command. The move delta is measured from the arrival of the time_left
+        acknowledgement to the arrival of the move, so it includes neither
+        a second round trip nor the wakeup of the calling thread. If
+        time_left fails, the genmove response is read (and discarded) before
+        raising, so that later responses stay in step with their commands.
+
+        Arguments:
+        time_left -- (period, count) tuple as for time_left()
+        timeout -- max timeout for the move (see move())
+        """
+        assert self.color in [BLACK, WHITE], \
+                'Invalid color: {}'.format(self.color)
+        tl_cmd = 'time_left {col} {per} {cnt}'.format(
+                col=self.color, per=time_left[0], cnt=time_left[1])
+        mv_cmd = 'genmove ' + self.color
+        self._raw_send_command(tl_cmd + '\n' + mv_cmd)
+        response = self._recv_response_for(tl_cmd, self.gtp_timeout)
+        try:
+            self._check_empty_response(tl_cmd, response)
+        except GtpException:
+            with contextlib.suppress(GtpException):  # report the first error
+                self._recv_response_for(mv_cmd, timeout)
+            raise
+        before_move = self.last_resp_time
+        response = self._recv_response_for(mv_cmd, timeout)
+        delta = self.last_resp_time - before_move
+        return self._check_output_response(mv_cmd, response), delta
+
     def move(self, timeout):
         """Return a generated move from the engine (in GTP notation)
 
@@ -765,7 +1745,7 @@ class TimedEngine(GtpEngine):
     """
     def __init__(self, name, settings=None, time_tolerance=0, move_wait=0,
                  gtp_genmove_extra=15, gtp_genmove_untimed_to=60,
-                 **kwargs):
+                 pipeline_genmove=False, **kwargs):
         """Init a TimedEngine
 
         Arguments:
@@ -777,6 +1757,8 @@ class TimedEngine(GtpEngine):
                              commands, in addition to time remaing according
                              to game clock
         gtp_genmove_untied_to -- GTP timeout for untimed games
+        pipeline_genmove -- send time_left and genmove in one write
+                            (default False)
 
         Additional keyword arguments are passed on to GtpEngine.__init__
         """
@@ -786,6 +1768,7 @@ class TimedEngine(GtpEngine):
         self.move_wait = move_wait
         self.gtp_genmove_extra = gtp_genmove_extra
         self.gtp_genmove_untimed_to = gtp_genmove_untimed_to
+        self.pipeline_genmove = pipeline_genmove
 
         self.max_time_taken = None
         self.total_time_taken = None
@@ -908,14 +1891,21 @@ class TimedEngine(GtpEngine):
         the time controls (with tolerance) were violated (Booelan) and the
         move delta (time the engine used to think).
         """
+        pipelined = False
         if self.time_tol >= 0 and not self.settings.is_untimed():
-            self.time_left(*self.gtp_time_left)
             gtp_timeout = self.move_timeout + self.gtp_genmove_extra
+            pipelined = self.pipeline_genmove
+            if not pipelined:
+                self.time_left(*self.gtp_time_left)
         else:
             gtp_timeout = self.gtp_genmove_untimed_to
-        before_move = datetime.datetime.utcnow()
-        move = self.move(gtp_timeout)
-        delta = datetime.datetime.utcnow() - before_move
+        if pipelined:
+            move, delta = self.time_left_and_move(self.gtp_time_left,
+                                                  gtp_timeout)
+        else:
+            before_move = datetime.datetime.utcnow()
+            move = self.move(gtp_timeout)
+            delta = datetime.datetime.utcnow() - before_move
         self.moves_made += 1  # increments on resign/timeout, unlike num_moves
 
         return(move, self._checkin_delta(delta), delta)
@@ -927,12 +1917,14 @@ class ManagedEngine(TimedEngine):
     Tries to ensure proper shutdown/process kills, closing files, logging and
     running acc/to config instructions.
      """
-    def __init__(self, name, match, outfunc, **kwargs):
+    def __init__(self, name, match, outfunc, is_spare=False, **kwargs):
         """Init a Managed Engine
 
         Arguments:
         name -- name of the engine
         match -- the match where the engine will play
+        outfunc -- function for writing to the match logs
+        is_spare -- this is a hot spare for another engine (default False)
 
         Keyword arguments are passed on to TimedEngine.__init__
         """
@@ -940,11 +1932,22 @@ class ManagedEngine(TimedEngine):
                          settings=match.game_settings,
                          time_tolerance=match.time_tol,
                          move_wait=match.move_wait,
+                         pipeline_genmove=match.pipeline_genmove,
                          **kwargs)
-        self.last_restart_rq = None
         self.popen = None
-        self.restarts = 0
-        self.cmd_line = match.cnf[name]['cmd']
+        self.thread_watch = None
+        self.is_spare = is_spare
+        self.hot_spare = (not is_spare and match.cnf[name].getboolean(
+                'hotspare', fallback=False))
+        self.spare = None
+        self.spare_thread = None
+        self.spare_args = (match, outfunc, kwargs)
+        self.engine_pool = match.engine_pool
+        self.connect = match.cnf[name].get('connect', fallback=None)
+        if self.connect:
+            self.cmd_line = match.cnf[name].get('cmd', fallback='')
+        else:
+            self.cmd_line = match.cnf[name]['cmd']
         self.wk_dir = match.cnf[name].get('wkdir', fallback=None)
         self.req_cmds = set()
         if self.name in match.engine_names:
@@ -959,6 +1962,7 @@ class ManagedEngine(TimedEngine):
             except KeyError:
                 continue
         self.stats = [0] * 8
+        self.err_lag_total = [0, 0.0]  # stderr reader lags, time (match)
         self.show_diagnostics = match.show_diagnostics
         self.show_debug = match.show_debug
         self.gtp_debug = match.gtp_debug
@@ -966,8 +1970,40 @@ class ManagedEngine(TimedEngine):
                 'quiet', fallback=match.suppress_err)
         self.log_stderr = match.cnf[name].getboolean(
                 'log_stderr', fallback=match.log_stderr)
-        self.gtp_init_timeout = match.cnf[name].get(
+        self.segmented_err = match.cnf[name].getboolean(
+                'segmentedstderr', fallback=match.segmented_err)
+        self.err_direct = (self.segmented_err and self.log_stderr
+                           and self.suppress_err)
+        self.gtp_init_timeout = match.cnf[name].getfloat(
                 'gtpinitialtimeout', fallback=match.gtp_init_timeout)
+        self.cpu_hang_window = match.cnf[name].getfloat(
+                'cpuhangwindow', fallback=match.cpu_hang_window)
+        self.adaptive_to = match.adaptive_to
+        self.adaptive_to_min = match.adaptive_to_min
+        self.latency, self.learned_to = match.cnf.engine_latency(name)
+        self.move_cpu_times = match.move_cpu_times
+        self.last_move_cpu = None  # (user, sys) CPU secs of the last move
+        self.game_res = None  # game: [user, sys, moves, wall]
+        self.res_total = [0.0, 0.0, 0.0, 0]  # match: user, sys, wall, max RSS
+        self.max_rss = match.cnf[name].getfloat('maxrss', fallback=0)
+        self.max_vms = match.cnf[name].getfloat('maxvms', fallback=0)
+        self.proactive_restarts = 0
+        self.use_cgroup = match.cnf[name].getboolean('cgroup', fallback=False)
+        self.cgroup_cpu_max = match.cnf[name].getfloat('cgroupcpumax',
+                                                       fallback=0)
+        self.cgroup_cpus = match.cnf[name].get('cgroupcpus', fallback=None)
+        self.cgroup_mem_max = match.cnf[name].getfloat('cgroupmemmax',
+                                                       fallback=0)
+        self.cgroup = None
+        self.game_cg_stat = None  # cpu.stat at game start
+        self.nice = match.cnf[name].getint('nice',
+                                           fallback=Match.original_nice)
+        self.io_prio = match.cnf[name].get('ioprio', fallback=None)
+        self.reader_sched = match.reader_sched
+        self.core_share = match.core_shares[name]
+        self.watch_progress = False  # } CPU progress watch during genmove:
+        self.progress_mark = None  # } (CPU seconds, when first seen)
+        self.genmove_start = None  # }
         self.match_dir = match.match_dir
         self._output = outfunc
 
@@ -976,9 +2012,11 @@ class ManagedEngine(TimedEngine):
         if self.show_debug:
             self._engerr('Entering context [{}]'.format(self.name))
 
+        parked = self.engine_pool.take(self) if self.engine_pool else None
         while True:
             try:
-                self._invoke()
+                self._invoke(parked)
+                self._start_spare()
                 break
             except (GtpMissingCommands, GtpResponseError) as e:
                 msg = 'GTP error during startup looks permanent ({})'
@@ -999,7 +2037,17 @@ class ManagedEngine(TimedEngine):
             msg = 'Exiting context (Err: {et}, {ev}).'
             etname = etype.__name__ if etype else None
             self._engerr(msg.format(et=etname, ev=evalue))
-        self.shutdown()
+        parked = False
+        try:
+            self._discard_spare()
+            parked = (etype is None and self.engine_pool is not None
+                      and self.engine_pool.park(self))
+            if not parked:
+                self.shutdown(keep_connection=etype is None)
+        finally:
+            self.set_err_file()
+            if self.cgroup and not self.is_spare and not parked:
+                self.cgroup.remove()
 
     def _cmd_line_interpolate(self):
         """Return the engine command line with interpolated settings"""
@@ -1012,7 +2060,8 @@ class ManagedEngine(TimedEngine):
                     maintime=self.settings.main_time,
                     periodtime=self.settings.period_time,
                     periodcount=self.settings.period_count,
-                    timesys=self.settings.time_sys)
+                    timesys=self.settings.time_sys,
+                    **self.core_share)
         except (AttributeError, KeyError, IndexError, ValueError,
                 TypeError) as e:
             msg = 'Command interpolation error ({et}):\n   {cmd}'
@@ -1021,6 +2070,30 @@ class ManagedEngine(TimedEngine):
                     self.name, msg.format(et=etype, cmd=self.cmd_line))
         return interpolated
 
+    def _win_program_in_wk_dir(self, cmd_line):
+        """Return cmd_line with a relative program path resolved in wk_dir
+
+        On POSIX, Popen looks for a relative program path in cwd, on Windows
+        it does not, so do it here (trying common executable extensions).
+
+        Arguments:
+        cmd_line -- the interpolated command line
+        """
+        if not self.wk_dir:
+            return cmd_line
+        cmd_line = cmd_line.lstrip()
+        try:
+            prog = shlex.split(cmd_line, posix=False)[0]
+        except (IndexError, ValueError):
+            return cmd_line
+        if os.path.isabs(prog.strip('"')):
+            return cmd_line
+        path = os.path.join(os.path.abspath(self.wk_dir), prog.strip('"'))
+        for ext in ['', '.exe', '.com', '.bat', '.cmd']:
+            if os.path.isfile(path + ext):
+                return '"{}"{}'.format(path + ext, cmd_line[len(prog):])
+        return cmd_line
+
     def _gtp_check(self):
         """Check engine is running and supports required commands"""
         missing_cmds, attribs = self.verify_commands(self.req_cmds,
@@ -1028,6 +2101,11 @@ class ManagedEngine(TimedEngine):
         diag_msg = (ENGINE_DIAG.format(**attribs)
                     + (ENGINE_OK if not missing_cmds else ENGINE_FAIL))
         self._output(diag_msg, fmt=self.name, log='runlog', flush=True)
+        if self.reader_sched_result:
+            sched_msg = ENGINE_RSCH.format(self.reader_sched_result)
+            self._output(sched_msg, fmt=self.name, log='runlog', flush=True)
+            if 'not granted' in sched_msg:
+                self._engerr(sched_msg)
         if missing_cmds or self.show_diagnostics:
             self._engerr(diag_msg)
         if missing_cmds:
@@ -1036,14 +2114,41 @@ class ManagedEngine(TimedEngine):
             raise GtpMissingCommands(
                     msg.format(name=self.name, mstr=missing_str))
 
-    def _invoke(self):
-        """Start the subproccess and reader threads
+    def _invoke(self, parked=None):
+        """Start the subproccess and reader threads, check GTP, run prematch
 
         Should always be called within a try block, with a shutdown() issued
         to the engine, if an exception is raised.
+
+        Arguments:
+        parked -- an idle engine from EnginePool, whose process to adopt
+                  instead of starting one (default None)
         """
         if self.popen:
             return
+        if parked:
+            self.adopt_process(parked)
+            msg = ENGINE_REUS.format(pid=self.popen.pid)
+            if self.show_diagnostics:
+                self._engerr(msg)
+            self._output(msg, fmt=self.name, log='runlog', flush=True)
+        else:
+            self._spawn()
+        self._gtp_check()
+        self.prematch_setup()
+
+    def _spawn(self):
+        """Start the subprocess and reader threads (no GTP)
+
+        The engine is started in its working directory via Popen's cwd
+        argument, without changing dumbarb's own working directory, so engines
+        can be started from several threads at once.
+
+        With Connect, connects to the engine server instead (see _connect).
+        """
+        if self.connect:
+            self._connect()
+            return
         cmd_line_interp = self._cmd_line_interpolate()
         engdir_msg = ENGINE_DIR.format(dir=self.wk_dir)
         engcmd_msg = ENGINE_CMD.format(cmd=cmd_line_interp)
@@ -1052,41 +2157,391 @@ class ManagedEngine(TimedEngine):
             self._engerr(engcmd_msg)
         self._output(engdir_msg, fmt=self.name, log='runlog')
         self._output(engcmd_msg, fmt=self.name, log='runlog', flush=True)
+        if any('{' + field in self.cmd_line for field in self.core_share):
+            core_msg = ENGINE_CORE.format(**self.core_share)
+            self._output(core_msg, fmt=self.name, log='runlog', flush=True)
 
-        # do not use popen's cwd argument, as behaviour platform-dependant
-        if self.wk_dir:
-            try:
-                starting_wk_dir = os.getcwd()
-                os.chdir(self.wk_dir)
-            except OSError as e:
-                raise PermanentEngineError(self.name, str(e))
         windows = sys.platform.startswith('win')
         if windows:
-            platform_cmd = cmd_line_interp
+            platform_cmd = self._win_program_in_wk_dir(cmd_line_interp)
         else:
             platform_cmd = shlex.split(cmd_line_interp)
+        stderr_dest = subprocess.PIPE
+        if self.err_direct:
+            stderr_dest = self._open_direct_err()
+        preexec = None
+        if self.max_vms and resource and not hasattr(resource, 'prlimit'):
+            preexec = self._rlimit_as  # no prlimit (not Linux)
         try:
             self.popen = subprocess.Popen(
                     platform_cmd,
                     bufsize=0,
+                    cwd=self.wk_dir,
                     stdin=subprocess.PIPE,
                     stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE)
+                    stderr=stderr_dest,
+                    preexec_fn=preexec)
         except OSError as e:
             msg = 'Could not run command:\n{err}\ncmd: {cmd}\ndir: {dir}'
-            f_msg = msg.format(err=e, cmd=platform_cmd, dir=os.getcwd())
+            f_msg = msg.format(err=e, cmd=platform_cmd,
+                               dir=self.wk_dir or os.getcwd())
             raise PermanentEngineError(self.name, f_msg) from None
-        if self.wk_dir:
+        if self.max_vms and resource and preexec is None:
             try:
-                os.chdir(starting_wk_dir)
-            except OSError as e:
-                raise PermanentEngineError(self.name, str(e))
+                resource.prlimit(self.popen.pid, resource.RLIMIT_AS,
+                                 (self._vms_limit(), self._vms_limit()))
+            except (OSError, ValueError) as e:
+                self._engerr('Could not apply MaxVms: {}'.format(e))
+        if self.use_cgroup:
+            self._isolate()
+        if self.nice is not None or self.io_prio:
+            self._set_priority()
         self.eout = self.popen.stdout
         self.ein = self.popen.stdin
         self.eerr = self.popen.stderr
         self._start_readers()
-        self._gtp_check()
-        self.prematch_setup()
+        self.thread_watch = threading.Thread(
+                name='proc-watch',
+                target=self._w_proc_exit,
+                daemon=True)
+        self.thread_watch.start()
+
+    def _connect(self):
+        """Get a connection to the engine server (Connect) from the pool
+
+        The connection takes the place of the engine process and its GTP
+        reader thread (see GtpConnection); process limits, cgroups and
+        priorities do not apply. Tries CONNECT_TRIES times, CONNECT_WAIT
+        seconds apart, as the server may be restarting.
+
+        Exceptions: GtpProcessError, PermanentEngineError (bad address)
+        """
+        for attempt in range(1, CONNECT_TRIES + 1):
+            try:
+                conn, pooled = GtpPool.acquire(self, self.gtp_init_timeout)
+                break
+            except ValueError as e:
+                msg = 'Bad Connect address "{addr}": {err}'
+                raise PermanentEngineError(
+                        self.name,
+                        msg.format(addr=self.connect, err=e)) from None
+            except OSError as e:
+                msg = 'Could not connect to {addr} ({n}/{tries}): {err}'
+                f_msg = msg.format(addr=self.connect, n=attempt,
+                                   tries=CONNECT_TRIES, err=e)
+                self._engerr(f_msg)
+                self._output(f_msg, fmt=self.name, log='runlog', flush=True)
+                if attempt < CONNECT_TRIES:
+                    time.sleep(CONNECT_WAIT)
+        else:
+            msg = '[{name}] could not connect to {addr}'
+            raise GtpProcessError(msg.format(name=self.name,
+                                             addr=self.connect))
+        conn_msg = ENGINE_CONN.format(addr=self.connect,
+                                      pooled=' (pooled)' if pooled else '')
+        if self.show_diagnostics:
+            self._engerr(conn_msg)
+        self._output(conn_msg, fmt=self.name, log='runlog', flush=True)
+        self.popen = conn
+        self.ein = conn
+        self.eout = None
+        self.eerr = None
+        self.resp_queue = conn.resp_queue
+        self.gtp_down = conn.gtp_down
+
+    def _isolate(self):
+        """Move the new engine process into its cgroup, log the outcome
+
+        If cgroup v2 delegation is not available, falls back to setting the
+        CPU affinity of the engine's threads to CgroupCpus (if set); the CPU
+        and memory limits are not applied then.
+        """
+        reason = None
+        if self.cgroup is None:
+            if EngineCgroup.setup():
+                try:
+                    self.cgroup = EngineCgroup(
+                            self.name, cpu_max=self.cgroup_cpu_max,
+                            cpus=self.cgroup_cpus,
+                            mem_max=self.cgroup_mem_max)
+                except OSError as e:
+                    reason = str(e)
+            else:
+                reason = EngineCgroup.error
+        if self.cgroup:
+            try:
+                self.cgroup.add(self.popen.pid)
+                msg = ENGINE_CGRP.format(
+                        path=self.cgroup.path,
+                        settings=', '.join(self.cgroup.settings)
+                                 or 'no limits')
+            except OSError as e:
+                reason = str(e)
+        if reason:
+            fallback = 'no affinity set'
+            if self.cgroup_cpus and hasattr(os, 'sched_setaffinity'):
+                try:
+                    cpus = parse_cpu_list(self.cgroup_cpus)
+                    for tid in self._tids():
+                        os.sched_setaffinity(tid, cpus)
+                    fallback = 'CPU affinity set to ' + self.cgroup_cpus
+                except (OSError, ValueError) as e:
+                    fallback = 'could not set CPU affinity: {}'.format(e)
+            msg = ENGINE_NOCG.format(reason=reason, fallback=fallback)
+            self._engerr(msg)
+        elif self.show_diagnostics:
+            self._engerr(msg)
+        self._output(msg, fmt=self.name, log='runlog', flush=True)
+
+    def _tids(self):
+        """Return the thread ids of the engine process (Linux)
+
+        Exceptions: OSError
+        """
+        task_dir = '/proc/{}/task'.format(self.popen.pid)
+        return [int(tid) for tid in os.listdir(task_dir)]
+
+    def _set_priority(self):
+        """Apply Nice and IoPrio to the new engine process, log the outcome
+
+        Niceness is set for each thread of the process (new threads and
+        child processes inherit it); lowering it needs privileges. The I/O
+        priority is set with the ionice utility (Linux). The priorities
+        actually in effect are read back and logged.
+        """
+        results = []
+        if self.nice is not None:
+            try:
+                try:
+                    tids = self._tids()
+                except OSError:  # no /proc: main thread only
+                    tids = [self.popen.pid]
+                for tid in tids:
+                    os.setpriority(os.PRIO_PROCESS, tid, self.nice)
+                actual = os.getpriority(os.PRIO_PROCESS, self.popen.pid)
+                results.append('nice {} ({})'.format(
+                        self.nice, 'granted' if actual == self.nice
+                        else 'not granted, is {}'.format(actual)))
+            except (AttributeError, OSError) as e:
+                results.append('nice {} (not granted: {})'.format(self.nice,
+                                                                  e))
+        if self.io_prio:
+            io_class, _, level = self.io_prio.partition(':')
+            cmd = ['ionice', '-c', IO_CLASSES.get(io_class, io_class)]
+            if level:
+                cmd += ['-n', level]
+            pid = ['-p', str(self.popen.pid)]
+            try:
+                subprocess.run(cmd + pid, check=True, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT)
+                actual = subprocess.run(['ionice'] + pid, check=True,
+                                        stdout=subprocess.PIPE).stdout
+                results.append('I/O {} (in effect: {})'.format(
+                        self.io_prio, actual.decode().strip()))
+            except subprocess.CalledProcessError as e:
+                results.append('I/O {} (not granted: {})'.format(
+                        self.io_prio, e.stdout.decode().strip()))
+            except OSError as e:
+                results.append('I/O {} (not granted: {})'.format(
+                        self.io_prio, e))
+        msg = ENGINE_PRIO.format('; '.join(results))
+        if self.show_diagnostics or 'not granted' in msg:
+            self._engerr(msg)
+        self._output(msg, fmt=self.name, log='runlog', flush=True)
+
+    def _vms_limit(self):
+        """Return MaxVms in bytes"""
+        return int(self.max_vms * 1048576)
+
+    def _rlimit_as(self):
+        """Set RLIMIT_AS to MaxVms (run in the child before exec)"""
+        resource.setrlimit(resource.RLIMIT_AS,
+                           (self._vms_limit(), self._vms_limit()))
+
+    def _w_proc_exit(self):
+        """Thread: wait for the engine process to exit, wake waiting callers
+
+        Uses a pidfd where available (Linux), otherwise waits on the process.
+        After the exit, gives the GTP reader a moment to read any last
+        responses, then queues a GtpProcessError with the exit status, so
+        that a caller waiting for a response fails immediately.
+        """
+        popen = self.popen
+        resp_queue = self.resp_queue
+        gtp_down = self.gtp_down
+        try:
+            pidfd = os.pidfd_open(popen.pid)
+        except (AttributeError, OSError):  # Python < 3.9, not Linux, etc.
+            pidfd = None
+        if pidfd is None:
+            popen.wait()
+        else:
+            try:
+                select.select([pidfd], [], [])
+            finally:
+                os.close(pidfd)
+        gtp_down.wait(PROC_EXIT_GRACE)
+        exit_code = popen.poll()
+        if exit_code is None:
+            status = 'exit status unknown'
+        elif exit_code < 0:
+            try:
+                status = 'killed by ' + signal.Signals(-exit_code).name
+            except ValueError:
+                status = 'killed by signal {}'.format(-exit_code)
+        else:
+            status = 'exit code {}'.format(exit_code)
+        msg = '[{name}] engine process exited ({status})'
+        resp_queue.put((GtpProcessError(msg.format(name=self.name,
+                                                   status=status)),
+                        datetime.datetime.utcnow()))
+
+    def _open_direct_err(self):
+        """Open (if needed) and return the match stderr log for the engine
+
+        Used when the engine process writes its stderr to the log directly.
+        The file is opened for appending, so several processes (e.g. a hot
+        spare) can share it.
+        """
+        err_dir = os.path.join(self.match_dir, ERR_SUBDIR)
+        filename = os.path.join(err_dir, ERR_SEG_LOG.format(name=self.name))
+        if self.err_file and self.err_file.name == filename:
+            return self.err_file
+        try:
+            os.makedirs(err_dir, exist_ok=True)
+            self.set_err_file()
+            with self.err_lock:
+                self.err_file = open(filename, 'ab')
+        except OSError as e:
+            msg = 'Could not open stderr log:\n{}'
+            raise PermanentEngineError(self.name, msg.format(e)) from None
+        return self.err_file
+
+    def _start_spare(self):
+        """Spawn a hot spare process and GTP-check it in a background thread
+
+        Does nothing if hot spares are not configured or one already exists.
+        """
+        if not self.hot_spare or self.spare:
+            return
+        match, outfunc, kwargs = self.spare_args
+        self.spare = ManagedEngine(self.name, match, outfunc,
+                                   is_spare=True, **kwargs)
+        try:
+            self.spare._spawn()
+        except DumbarbException as e:
+            self._engerr('Could not start hot spare:', sub=e)
+            self.close_idle(self.spare)
+            self.spare = None
+            return
+        self.spare_thread = threading.Thread(
+                name='spare-chk',
+                target=self.spare._spare_check,
+                daemon=True)
+        self.spare_thread.start()
+
+    def _spare_check(self):
+        """Thread: check a freshly spawned hot spare, then leave it idle
+
+        On failure, gtp_down is set, so the spare will not be adopted.
+        """
+        try:
+            self._gtp_check()
+            self.prematch_setup()
+            self._output('Hot spare ready.', fmt=self.name, log='runlog',
+                         flush=True)
+        except DumbarbException as e:
+            self._engerr('Hot spare failed GTP check:', sub=e)
+            self.gtp_down.set()
+
+    def _join_spare(self):
+        """Wait for the hot spare's check to finish; return the spare if it is
+        usable, shut it down and return None otherwise"""
+        spare = self.spare
+        if not spare:
+            return None
+        self.spare_thread.join()
+        self.spare_thread = None
+        self.spare = None
+        if (spare.popen and spare.popen.poll() is None
+                and not spare.gtp_down.is_set()):
+            return spare
+        self.close_idle(spare, 'unusable hot spare')
+        return None
+
+    def _discard_spare(self):
+        """Shut down the hot spare, if any"""
+        spare = self._join_spare()
+        if spare:
+            self.close_idle(spare)
+
+    @staticmethod
+    def close_idle(engine, reason=None):
+        """Shut down an idle engine (a hot spare that was not adopted, or one
+        parked in EnginePool), remove its cgroup
+
+        Arguments:
+        engine -- the idle ManagedEngine
+        reason -- the shutdown reason (default None)
+        """
+        try:
+            engine.shutdown(reason)
+        finally:
+            engine.set_err_file()
+            if engine.cgroup:
+                engine.cgroup.remove()
+
+    def adopt_process(self, spare):
+        """Take over the running process, streams and threads of spare
+
+        The engine must not have a process of its own (e.g. after shutdown).
+        The spare's reader threads keep running but deliver responses and
+        stderr to this engine.
+
+        Arguments:
+        spare -- a ManagedEngine with a started, GTP-checked process
+        """
+        assert self.popen is None, 'Adopting process while having one'
+        self.popen = spare.popen
+        self.ein = spare.ein
+        self.eout = spare.eout
+        self.eerr = spare.eerr
+        self.thread_eout = spare.thread_eout
+        self.thread_eerr = spare.thread_eerr
+        self.resp_queue = spare.resp_queue
+        self.gtp_down = spare.gtp_down
+        self.err_wakeup = spare.err_wakeup
+        self.err_drained = spare.err_drained
+        self.thread_echo = spare.thread_echo
+        self.thread_watch = spare.thread_watch
+        self.quit_sent = spare.quit_sent
+        spare.err_owner = self
+        if self.connect:
+            self.popen.owner = self
+        spare.popen = None
+        spare.set_err_file()  # direct stderr: the process keeps its own fd
+        if spare.cgroup:
+            self._adopt_cgroup(spare)
+
+    def _adopt_cgroup(self, spare):
+        """Take over the cgroup of an adopted spare, remove the old one
+
+        CPU counters used so far in the game (in the old cgroup) are carried
+        over, so that the game's cgroup stats stay complete.
+
+        Arguments:
+        spare -- the spare, whose process has just been adopted
+        """
+        old, self.cgroup, spare.cgroup = self.cgroup, spare.cgroup, None
+        if old is None:
+            return
+        if self.game_cg_stat is not None:
+            used = old.cpu_stat()
+            now = self.cgroup.cpu_stat()
+            self.game_cg_stat = {
+                    key: now.get(key, 0) - (used.get(key, 0) - before)
+                    for key, before in self.game_cg_stat.items()}
+        old.remove()  # empty: the old process has been shut down
 
     def prematch_setup(self):
         """Run prematch user commands and set up board/time settings"""
@@ -1176,16 +2631,23 @@ class ManagedEngine(TimedEngine):
         except KeyError:
             pass
 
-    def shutdown(self, reason=None):
+    def shutdown(self, reason=None, keep_connection=False):
         """Shutdown engine, take care of subprocess, threads, close files.
+
+        Arguments:
+        reason -- the reason, shown with diagnostics (default None)
+        keep_connection -- return the connection to an engine server
+                           (Connect) to the pool if idle (default False)
         """
         if not self.popen:
-            self.set_err_file()
             return
         if self.show_diagnostics and reason is not None:
             self._engerr('Shutting down: {}'.format(str(reason)))
         elif self.show_debug:
             self._engerr('Shutting down.')
+        if self.connect:
+            self._disconnect(keep_connection)
+            return
         if not self.quit_sent and not self.gtp_down.is_set():
             if self.show_debug:
                 self._engerr('Engine was not quit, sending "quit"')
@@ -1203,11 +2665,15 @@ class ManagedEngine(TimedEngine):
             self._engerr('Killing process:', sub=e)
             self.popen.kill()
 
-        self._stop_readers()
+        self._stop_readers(READER_JOIN_TO)
         self.popen.stdout.close()
-        self.popen.stderr.close()
+        if self.popen.stderr:
+            self.popen.stderr.close()
         self.popen.stdin.close()
         self.popen.wait()
+        if self.thread_watch:
+            self.thread_watch.join()
+            self.thread_watch = None
         poll = self.popen.poll()
         if poll is None:
             # do not want to continue with processes running wild
@@ -1218,6 +2684,25 @@ class ManagedEngine(TimedEngine):
         self._output(msg, fmt=self.name, log='runlog', flush=True)
         self._engerr(msg)
 
+    def _disconnect(self, keep):
+        """Close the engine server connection or return it to the pool
+
+        No "quit" is sent: the server decides what happens to its engine
+        when the connection is closed.
+
+        Arguments:
+        keep -- return the connection to the pool if idle
+        """
+        conn, self.popen = self.popen, None
+        self.ein = None
+        if keep and GtpPool.release(self, conn):
+            msg = 'Connection returned to pool.'
+        else:
+            conn.close()
+            msg = 'Connection closed.'
+        self._output(msg, fmt=self.name, log='runlog', flush=True)
+        self._engerr(msg)
+
     def restart(self, severity=1, reason='no reason specified'):
         """Restart the engine up to ENGINE_RESTART times
 
@@ -1234,32 +2719,19 @@ class ManagedEngine(TimedEngine):
             self._output(r_msg, fmt=self.name, log='runlog', flush=True)
         finally:
             self.shutdown()
-        utcnow = datetime.datetime.utcnow()
-        if self.last_restart_rq:
-            s_since_last = (utcnow - self.last_restart_rq).total_seconds()
-            if s_since_last < 20:
-                if self.show_debug:
-                    msg = 'Restarting too often, too fast, about to give up.'
-                    self._engerr(msg)
-                severity += 2
-            elif s_since_last < 180:
-                if self.show_debug:
-                    msg = 'Restarting fairly often, will give up soon.'
-                    self._engerr(msg)
-                severity += 1
-            elif s_since_last > 600:
-                self.restarts = max(ENGINE_RESTART // 2, self.restarts)
-            elif s_since_last > 1800:
-                self.restarts = ENGINE_RESTART
-        self.last_restart_rq = utcnow
-
-        self.restarts += severity
-        if self.restarts > ENGINE_RESTART:
-            msg = ('Engine restarted too quickly too many times'
-                   ' (or with high severity level).')
-            raise PermanentEngineError(self.name, msg)
+        severity = self._count_restart(severity)
+        spare = self._join_spare()
+        if spare:
+            self.adopt_process(spare)
+            msg = 'Swapped in hot spare.'
+            self._output(msg, fmt=self.name, log='runlog', flush=True)
+            if self.show_diagnostics:
+                self._engerr(msg)
+            self._start_spare()
+            return
         try:
             self._invoke()
+            self._start_spare()
         except GtpException as e:
             msg = 'error during restart; trying again: {}'
             self.restart(severity=severity + 0.5, reason=msg.format(e))
@@ -1294,54 +2766,842 @@ class ManagedEngine(TimedEngine):
             self.stats[6] = maxtt  # max t/move for match
         self.stats[7] += self.total_time_taken.total_seconds()
 
-    def output_match_stats(self):
-        """Print some match stats to stderr / runlog
+    def timed_move(self):
+        """Play a move (see TimedEngine), watching the engine's CPU progress
+
+        If CpuHangWindow is set and the engine uses no CPU for that many
+        seconds while generating the move, GtpHang is raised. If
+        MoveCpuTimes is set, the CPU time used is stored in last_move_cpu.
         """
-        statmsg = ENGINE_MSTA.format(stats=self.stats)
-        self._engerr(statmsg)
-        self._output(statmsg, fmt=self.name, log='runlog', flush=True)
+        self.watch_progress = self.cpu_hang_window > 0
+        self.progress_mark = None
+        self.genmove_start = time.monotonic()
+        before = self._proc_tree_stat() if self.move_cpu_times else None
+        try:
+            result = super().timed_move()
+        finally:
+            self.watch_progress = False
+        self.last_move_cpu = None
+        after = self._proc_tree_stat() if before else None
+        if after:
+            self.last_move_cpu = (after[0] - before[0], after[1] - before[1])
+            if self.game_res:
+                self.game_res[0] += self.last_move_cpu[0]
+                self.game_res[1] += self.last_move_cpu[1]
+                self.game_res[2] += 1
+                self.game_res[3] += result[2].total_seconds()
+        return result
+
+    def _check_progress(self):
+        """Raise GtpHang if the engine's CPU time has stopped increasing
+
+        Only active during timed_move. The CPU time of the engine process
+        and its descendants is read from /proc (Linux); elsewhere, or if the
+        process is gone, watching stops quietly.
+        """
+        if not self.watch_progress:
+            return
+        stat = self._proc_tree_stat()
+        if stat is None:
+            self.watch_progress = False
+            return
+        cpu, state, threads = stat[0] + stat[1], stat[2], stat[3]
+        now = time.monotonic()
+        if self.progress_mark is None or cpu > self.progress_mark[0]:
+            self.progress_mark = (cpu, now)
+            return
+        idle = now - self.progress_mark[1]
+        if idle < self.cpu_hang_window:
+            return
+        msg = ('[{name}] genmove hang: no CPU progress for {idle:.1f}s'
+               ' (waited {wait:.1f}s; CPU time {cpu:.2f}s, process state'
+               ' {state}, {thr} threads)')
+        raise GtpHang(msg.format(name=self.name, idle=idle,
+                                 wait=now - self.genmove_start, cpu=cpu,
+                                 state=state, thr=threads))
+
+    def _proc_tree_stat(self):
+        """Return (user CPU, system CPU, state, threads, pids) or None
+
+        CPU seconds are summed over the engine process and its descendants
+        (including their waited-for children), so engines started via
+        wrapper scripts are covered. State and threads are those of the
+        engine process itself; pids are those of the whole tree. Returns
+        None if /proc is unavailable (not Linux) or the engine has exited.
+        """
+        try:
+            ticks = os.sysconf('SC_CLK_TCK')
+        except (AttributeError, ValueError, OSError):
+            return None
+        if not self.popen or self.popen.pid is None:
+            return None  # engine server connection (Connect)
+        result = None
+        user = system = 0
+        tree = []
+        pids = [self.popen.pid]
+        while pids:
+            pid = pids.pop()
+            try:
+                with open(PROC_STAT.format(pid=pid)) as f:
+                    stat = f.read()
+            except OSError:
+                if result is None:
+                    return None  # engine process gone or no /proc
+                continue  # descendant exited meanwhile
+            # fields after the command name in parentheses, from field 3:
+            # state (3), utime (14), stime (15), cutime (16), cstime (17),
+            # num_threads (20)
+            fields = stat[stat.rindex(')') + 2:].split()
+            user += int(fields[11]) + int(fields[13])
+            system += int(fields[12]) + int(fields[14])
+            tree.append(pid)
+            if result is None:
+                result = (fields[0], int(fields[17]))
+            try:
+                with open(PROC_CHILDREN.format(pid=pid)) as f:
+                    pids.extend(int(child) for child in f.read().split())
+            except OSError:
+                pass  # kernel without CONFIG_PROC_CHILDREN
+        return (user / ticks, system / ticks) + result + (tree,)
+
+    def begin_game_resources(self):
+        """Start per-game resource accounting, reset peak RSS if possible"""
+        self.game_res = [0.0, 0.0, 0, 0.0]
+        self.game_cg_stat = self.cgroup.cpu_stat() if self.cgroup else None
+        stat = self._proc_tree_stat() if self.move_cpu_times else None
+        for pid in (stat[4] if stat else []):
+            try:
+                with open(PROC_CLEAR_REFS.format(pid=pid), 'w') as f:
+                    f.write('5')  # reset VmHWM (peak RSS) to current RSS
+            except OSError:
+                pass  # peak will be since process start
 
+    @staticmethod
+    def _proc_status_sum(pids, keys):
+        """Return {key: sum of /proc/<pid>/status values (KiB)} over pids
 
-class Match:
-    """Plays whole matches, stores settings, manages context
+        Arguments:
+        pids -- process ids (e.g. the engine's process tree)
+        keys -- status keys to sum, e.g. ['VmRSS', 'VmSize']
+        """
+        sums = dict.fromkeys(keys, 0)
+        for pid in pids:
+            try:
+                with open(PROC_STATUS.format(pid=pid)) as f:
+                    for line in f:
+                        key, _, value = line.partition(':')
+                        if key in sums:
+                            sums[key] += int(value.split()[0])
+            except (OSError, ValueError, IndexError):
+                continue
+        return sums
 
-    Context manager managing ManagedEngine instances, the match logfile, and
-    the directories needed (match dir, stderr, SGFs). GTP engines are not
-    created/invoked before the context of a Match is entered. This class
-    ensures (together with ManagedEngine) that all engines are terminated
-    normally or, failing that, killed off before starting another match. If
-    this somehow fails, AllAbort is called, cancelling all further Matches,
-    since a system with processes running wild is likely to prouce skewed match
-    results.
-    """
-    @staticmethod
-    def _chk_name(name):
-        """Check if name follows the rules
+    def check_memory(self, game_num):
+        """Restart the engine proactively if over MaxRss or soft MaxVms
+
+        Meant to be called between games. Memory use (KiB) is summed over
+        the engine's process tree (Linux). The soft VMS limit is MEM_SOFT_VMS
+        of MaxVms, which is also enforced as a hard RLIMIT_AS in _spawn.
+
+        Arguments:
+        game_num -- the number of the game just finished
+        """
+        if not (self.max_rss or self.max_vms) or not self.popen:
+            return
+        stat = self._proc_tree_stat()
+        if stat is None:
+            return
+        mem = self._proc_status_sum(stat[4], ['VmRSS', 'VmSize'])
+        rss_limit = int(self.max_rss * 1024)
+        vms_limit = int(self.max_vms * 1024 * MEM_SOFT_VMS)
+        if rss_limit and mem['VmRSS'] > rss_limit:
+            what, kib, limit = 'RSS', mem['VmRSS'], rss_limit
+        elif vms_limit and mem['VmSize'] > vms_limit:
+            what, kib, limit = 'VMS', mem['VmSize'], vms_limit
+        else:
+            return
+        self.proactive_restart(ENGINE_MEMX.format(
+                num=game_num, what=what, kib=kib, limit=limit))
+
+    def proactive_restart(self, reason):
+        """Restart a working engine; not counted towards ENGINE_RESTART
+
+        Falls back to restart() (which counts) if the new process fails.
 
+        Arguments:
+        reason -- the restart reason
         """
+        self.proactive_restarts += 1
         try:
-            return (name[0] in ENGALW_FRST and len(name) <= ENGALW_MAXC
-                    and set(name) <= set(ENGALW_CHAR) and name[-1:] != '.')
-        except ValueError:
-            pass
-        return False
+            if self.show_diagnostics:
+                self._engerr('Restarting proactively; reason:', sub=reason)
+            self._output('Proactive restart ({})...'.format(reason),
+                         fmt=self.name, log='runlog', flush=True)
+        finally:
+            self.shutdown()
+        spare = self._join_spare()
+        if spare:
+            self.adopt_process(spare)
+            self._output('Swapped in hot spare.', fmt=self.name,
+                         log='runlog', flush=True)
+            self._start_spare()
+            return
+        try:
+            self._invoke()
+            self._start_spare()
+        except GtpException as e:
+            msg = 'error during proactive restart: {}'
+            self.restart(reason=msg.format(e))
+        except:
+            self.shutdown('emergency during restart')
+            raise
 
-    def __init__(self, section_name, cnf, blacklist):
-        """Initialize a Match from DumbarbConfig and a match section name
+    def _log_cgroup_stat(self, game_num, before):
+        """Log the cgroup's CPU usage and throttling during a game
 
         Arguments:
-        section_name -- the match name, name of a section in the config file(s)
-        cnf -- DumbarbConfig instance containing the configuration
-        blacklist -- abort match if one of the engine names is in blacklist
+        game_num -- the game number in the match
+        before -- cpu.stat counters at the start of the game
         """
+        after = self.cgroup.cpu_stat()
+        delta = {key: after.get(key, 0) - before.get(key, 0)
+                 for key in ['usage_usec', 'user_usec', 'system_usec',
+                             'nr_periods', 'nr_throttled', 'throttled_usec']}
+        msg = ENGINE_GCGR.format(
+                num=game_num, usage=delta['usage_usec'] / 1e6,
+                user=delta['user_usec'] / 1e6, sys=delta['system_usec'] / 1e6,
+                nper=delta['nr_periods'], nthr=delta['nr_throttled'],
+                thr=delta['throttled_usec'] / 1e6)
+        self._output(msg, fmt=self.name, log='runlog', flush=True)
+
+    def log_game_resources(self, game_num):
+        """Log CPU time and peak RSS of the game to the runlog
+
+        The peak RSS (KiB) is summed over the engine's process tree. The
+        cgroup's CPU counters are logged as well, if the engine has one.
+
+        Arguments:
+        game_num -- the game number in the match
+        """
+        res, self.game_res = self.game_res, None
+        cg_before, self.game_cg_stat = self.game_cg_stat, None
+        if cg_before is not None:
+            self._log_cgroup_stat(game_num, cg_before)
+        stat = self._proc_tree_stat() if self.move_cpu_times else None
+        if not res or not stat:
+            return
+        rss = self._proc_status_sum(stat[4], ['VmHWM'])['VmHWM']
+        wall = res[3]
+        msg = ENGINE_GRES.format(
+                num=game_num, user=res[0], sys=res[1], moves=res[2],
+                wall=wall, rss=rss,
+                pct=100 * (res[0] + res[1]) / wall if wall else 0)
+        self._output(msg, fmt=self.name, log='runlog', flush=True)
+        self.res_total[0] += res[0]
+        self.res_total[1] += res[1]
+        self.res_total[2] += wall
+        self.res_total[3] = max(self.res_total[3], rss)
+
+    def log_err_lag(self, game_num):
+        """Log stderr reader lags since the last call to the runlog, if any
+
+        Arguments:
+        game_num -- the game number in the match
+        """
+        with self.err_lag_lock:  # counted by the stderr reader thread
+            count, lag_time = self.err_lag_count, self.err_lag_time
+            self.err_lag_count = 0
+            self.err_lag_time = 0.0
+        if not count:
+            return
+        self.err_lag_total[0] += count
+        self.err_lag_total[1] += lag_time
+        msg = ENGINE_ELAG.format(num=game_num, count=count, secs=lag_time)
+        self._output(msg, fmt=self.name, log='runlog', flush=True)
+        if self.show_debug:
+            self._engerr(msg)
+
+    def output_match_stats(self):
+        """Print some match stats to stderr / runlog
+        """
+        statmsg = ENGINE_MSTA.format(stats=self.stats)
+        if self.err_lag_total[0]:
+            statmsg += ENGINE_MLAG.format(count=self.err_lag_total[0],
+                                          secs=self.err_lag_total[1])
+        if self.proactive_restarts:
+            statmsg += ENGINE_MPRO.format(self.proactive_restarts)
+        self._engerr(statmsg)
+        self._output(statmsg, fmt=self.name, log='runlog', flush=True)
+        if self.res_total[2]:
+            user, system, wall, rss = self.res_total
+            resmsg = ENGINE_MRES.format(user=user, sys=system, wall=wall,
+                                        rss=rss,
+                                        pct=100 * (user + system) / wall)
+            self._engerr(resmsg)
+            self._output(resmsg, fmt=self.name, log='runlog', flush=True)
+        if self.latency:
+            self._output(self._latency_summary(), fmt=self.name,
+                         log='runlog', flush=True)
+
+    def _latency_summary(self):
+        """Return a line with the p99 latency and timeout of each category"""
+        ceilings = {'startup': self.gtp_init_timeout,
+                    'final_score': self.gtp_scorer_to}
+        items = []
+        for category, stats in sorted(self.latency.items()):
+            ceiling = ceilings.get(category, self.gtp_timeout)
+            items.append(ENGINE_LAT1.format(
+                    cat=category, p99=stats.quantile(0.99), n=stats.count,
+                    to=self.adapt_timeout(category, ceiling)))
+        return ENGINE_LATS + ', '.join(items)
+
+
+class GtpLoopProtocol(asyncio.SubprocessProtocol):
+    """Reads the output of an AsyncEngine's process on the event loop
+
+    Responses go to the response queue with the time they were read (as in
+    read_gtp); stderr, if piped, is echoed to the screen. The protocol is
+    also the engine's input stream: write() may be called from any thread.
+    """
+    def __init__(self, engine, resp_queue, gtp_down, exited):
+        """Init a GtpLoopProtocol
+
+        Arguments:
+        engine -- the AsyncEngine
+        resp_queue -- the response queue
+        gtp_down -- the event to set when stdout is closed
+        exited -- a future, set to the exit code when the process exits
+        """
+        self.engine = engine
+        self.resp_queue = resp_queue
+        self.gtp_down = gtp_down
+        self.exited = exited
+        self.loop = None
+        self.transport = None
+        self.responses = GtpResponses()
+        self.line_buf = b''
+
+    def connection_made(self, transport):
+        self.loop = asyncio.get_running_loop()
+        self.transport = transport
+
+    def pipe_data_received(self, fd, data):
+        if fd == 2:
+            sys.stderr.write(data.decode(errors='replace'))
+            return
+        now = datetime.datetime.utcnow()
+        *lines, self.line_buf = (self.line_buf + data).split(b'\n')
+        for line in lines:
+            response = self.responses.feed(line + b'\n')
+            if response is None:
+                continue
+            if self.engine.gtp_debug:
+                self.engine._engerr('Received: {}'.format(response))
+            self.resp_queue.put((response, now))
+
+    def pipe_connection_lost(self, fd, exc):
+        if fd == 1:
+            if self.engine.show_debug:
+                self.engine._engerr('GTP -EOF-')
+            self.gtp_down.set()
+
+    def process_exited(self):
+        if not self.exited.done():
+            self.exited.set_result(self.transport.get_returncode())
+
+    def write(self, data):
+        """Send data to the engine (from any thread)"""
+        self.loop.call_soon_threadsafe(self._write, data)
+
+    def _write(self, data):
+        pipe = self.transport.get_pipe_transport(0)
+        if pipe is not None and not pipe.is_closing():
+            pipe.write(data)
+
+
+class AsyncEngine(TimedEngine):
+    """A TimedEngine whose process is run by an asyncio event loop
+
+    For embedding dumbarb (see async_play_game and async_run_match). The
+    pipes of the engine process are served by the loop (see GtpLoopProtocol),
+    so engines need no threads of their own. The GTP methods inherited from
+    GtpEngine and TimedEngine block: they, and restart(), must be called off
+    the loop, as async_play_game does by running the game in an executor.
+
+    Use as an async context manager, or call start() and stop().
+    """
+    def __init__(self, name, cmd, settings=None, wk_dir=None, quiet=True,
+                 req_cmds=None, gtp_init_timeout=15, **kwargs):
+        """Init an AsyncEngine
+
+        Arguments:
+        name -- name of the engine
+        cmd -- the command line (a string or a list of arguments)
+        settings -- a GameSettings object (default: a new one)
+        wk_dir -- working directory for the engine (default None: current)
+        quiet -- discard the engine's stderr (default True)
+        req_cmds -- GTP commands the engine must support (default: those
+                    players need with settings, see GameSettings)
+        gtp_init_timeout -- GTP timeout for the first command (default 15)
+
+        Additional keyword arguments are passed on to TimedEngine.__init__
+        """
+        super().__init__(name, settings=settings, **kwargs)
+        self.cmd = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+        self.wk_dir = wk_dir
+        self.suppress_err = quiet
+        self.req_cmds = (req_cmds if req_cmds is not None
+                         else self.settings.gtp_commands())
+        self.gtp_init_timeout = max(gtp_init_timeout, self.gtp_timeout)
+        self.loop = None
+        self.transport = None
+        self.exited = None  # future: exit code of the process
+        self.last_move_cpu = None  # not measured (see ManagedEngine)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, etype, evalue, etrace):
+        await self.stop()
+
+    async def start(self):
+        """Start the process, check GTP and send the game settings
+
+        Exceptions: PermanentEngineError, GtpException
+        """
+        self.loop = asyncio.get_running_loop()
+        await self._spawn()
+        try:
+            await self.loop.run_in_executor(None, self._setup)
+        except BaseException:
+            await self.stop()
+            raise
+
+    async def _spawn(self):
+        """Start the engine process on the loop"""
+        resp_queue = queue.Queue()
+        gtp_down = threading.Event()
+        self.exited = self.loop.create_future()
+        stderr = subprocess.DEVNULL if self.suppress_err else subprocess.PIPE
+        try:
+            self.transport, protocol = await self.loop.subprocess_exec(
+                    lambda: GtpLoopProtocol(self, resp_queue, gtp_down,
+                                            self.exited),
+                    *self.cmd, cwd=self.wk_dir, stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE, stderr=stderr)
+        except OSError as e:
+            msg = 'Could not run command:\n{err}\ncmd: {cmd}'
+            raise PermanentEngineError(
+                    self.name, msg.format(err=e, cmd=self.cmd)) from None
+        self.resp_queue = resp_queue
+        self.gtp_down = gtp_down
+        self.ein = protocol
+        self.quit_sent = False
+
+    def _setup(self):
+        """Check the required GTP commands, send the game settings (blocks)
+
+        Exceptions: PermanentEngineError, GtpException
+        """
+        missing_cmds, _ = self.verify_commands(self.req_cmds,
+                                               self.gtp_init_timeout)
+        if missing_cmds:
+            msg = 'missing required GTP commands:\n   {}'
+            raise PermanentEngineError(
+                    self.name, msg.format(', '.join(sorted(missing_cmds))))
+        self.game_settings(self.settings)
+
+    async def stop(self):
+        """Quit the engine; kill it if it has not exited after WAIT_QUIT"""
+        transport, self.transport = self.transport, None
+        if transport is None:
+            return
+        if not self.quit_sent and not self.gtp_down.is_set():
+            try:
+                await self.loop.run_in_executor(None, self.quit)
+            except GtpException as e:
+                self._engerr('Sending quit failed:', sub=e)
+        try:
+            await asyncio.wait_for(asyncio.shield(self.exited), WAIT_QUIT)
+        except asyncio.TimeoutError:
+            self._engerr('Killing process.')
+            try:
+                transport.kill()
+            except ProcessLookupError:
+                pass
+            await self.exited
+        transport.close()
+
+    def restart(self, severity=1, reason='no reason specified'):
+        """Restart the engine up to ENGINE_RESTART times (blocks)
+
+        Counted as in ManagedEngine.restart; must not be called on the loop.
+
+        Arguments:
+        severity -- by how much to increment the restart counter
+        reason -- optional restart reason (default 'no reason specified')
+        """
+        self._engerr('Restarting; reason:', sub=reason)
+        asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result()
+        severity = self._count_restart(severity)
+        asyncio.run_coroutine_threadsafe(self._spawn(), self.loop).result()
+        try:
+            self._setup()
+        except GtpException as e:
+            msg = 'error during restart; trying again: {}'
+            self.restart(severity=severity + 0.5, reason=msg.format(e))
+
+    def pregame_setup(self, color=None):
+        """Prepare engine for a new game; restart and try again on failure
+
+        See ManagedEngine.pregame_setup (there are no user commands).
+        """
+        while True:
+            try:
+                self.clear_board()
+                if color is not None:
+                    self.reset_game_timekeeping()
+                    self.set_color(color)
+                    self.moves_made = 0
+                break
+            except GtpException as e:
+                msg = 'Error during pregame prep: {}'
+                self.restart(reason=msg.format(e))
+
+    def postgame(self, move_list):
+        """Nothing to do after a game (no user commands)"""
+        pass
+
+
+class ResultSink:
+    """Receives the output of a match; this base class discards it (null)
+
+    Sinks are opened when entering the match context and fed in order by a
+    SinkWriter, from a thread of their own: write() gets the text of the
+    results, move times and run logs (as in the .log, .mvtimes and .run
+    files), game() the record of each finished game (see Match.game_record).
+    Subclasses override what they need.
+    """
+    def __init__(self, match):
+        """Open the sink for a match
+
+        Arguments:
+        match -- the Match (with match_dir set)
+        """
+        pass
+
+    def write(self, log, text, flush):
+        """Take text for one of the logs
+
+        Arguments:
+        log -- 'result', 'movetimes' or 'runlog'
+        text -- the text, ending with a newline
+        flush -- whether the text should be written out now
+        """
+        pass
+
+    def game(self, record):
+        """Take the record of a finished game (see Match.game_record)"""
+        pass
+
+    def close(self):
+        """Write out and close"""
+        pass
+
+
+class TextSink(ResultSink):
+    """The text logs: .log, .mvtimes and .run files, appended to"""
+    def __init__(self, match):
+        self.files = {}
+        try:
+            for log, filename in match.log_filenames.items():
+                self.files[log] = self._open(
+                        os.path.join(match.match_dir, filename))
+        except OSError:
+            self.close()
+            raise
+
+    @staticmethod
+    def _open(path):
+        return open(path, 'a')
+
+    def write(self, log, text, flush):
+        file = self.files[log]
+        file.write(text)
+        if flush:
+            file.flush()
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+
+
+class ArchiveSink(TextSink):
+    """Gzip-compressed copies of the text logs (.log.gz, etc.)
+
+    Written out when the match ends (flushing each line would spoil the
+    compression). Continuing a match (-c) adds a gzip member, which is read
+    as part of the same file.
+    """
+    @staticmethod
+    def _open(path):
+        return gzip.open(SINK_ARCHIVE.format(file=path), 'at')
+
+    def write(self, log, text, flush):
+        self.files[log].write(text)
+
+
+class JsonSink(ResultSink):
+    """JSON lines: an object per game, run log event and results log note
+
+    Game objects are the game records (see Match.game_record) with "type":
+    "game"; events and notes (e.g. StopRule verdicts) have "type" "event"
+    or "note", "match" and "text".
+    """
+    def __init__(self, match):
+        self.match_name = match.name
+        self.file = open(os.path.join(match.match_dir,
+                                      SINK_JSONL.format(name=match.log_base)),
+                         'a')
+
+    def write(self, log, text, flush):
+        if log == 'runlog':
+            kind = 'event'
+        elif log == 'result' and text.startswith(FMT_STOP_PRE):
+            kind = 'note'
+        else:
+            return  # games come with game()
+        self._dump({'type': kind, 'match': self.match_name,
+                    'text': text.rstrip('\n')}, flush)
+
+    def game(self, record):
+        self._dump(dict(type='game', **record), True)
+
+    def _dump(self, obj, flush):
+        self.file.write(json.dumps(obj) + '\n')
+        if flush:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SqliteSink(ResultSink):
+    """Games, moves and time violations in the session's database (SINK_DB)
+
+    Each game is written in one transaction; a game played again (after an
+    interruption, with -c) replaces the earlier one. Several matches (e.g.
+    of a tournament) may write to the database at the same time. dumbutil.py
+    uses connect() and store() to import .log and .mvtimes files, and to
+    query the database.
+    """
+    SCHEMA = ('PRAGMA journal_mode=WAL;'
+              'CREATE TABLE IF NOT EXISTS games ('
+              'match TEXT, game INTEGER, time TEXT, white TEXT, black TEXT,'
+              ' winner TEXT, reason TEXT, moves INTEGER, violations TEXT,'
+              ' PRIMARY KEY (match, game));'
+              'CREATE TABLE IF NOT EXISTS moves ('
+              'match TEXT, game INTEGER, num INTEGER, engine TEXT,'
+              ' color TEXT, coord TEXT, time REAL, cpu_user REAL,'
+              ' cpu_sys REAL, PRIMARY KEY (match, game, num));'
+              'CREATE TABLE IF NOT EXISTS violations ('
+              'match TEXT, game INTEGER, engine TEXT, move INTEGER,'
+              ' time REAL);'
+              'CREATE INDEX IF NOT EXISTS games_white ON games (white);'
+              'CREATE INDEX IF NOT EXISTS games_black ON games (black);'
+              'CREATE INDEX IF NOT EXISTS moves_engine'
+              ' ON moves (engine, color);'
+              'CREATE INDEX IF NOT EXISTS violations_game'
+              ' ON violations (match, game);'
+              'CREATE INDEX IF NOT EXISTS violations_engine'
+              ' ON violations (engine);'
+              'PRAGMA user_version = {};'.format(SINK_DB_VERSION))
+    VIO_RE = re.compile(r'(\S+) (\d+)\[([^\]]*)\]')  # see Game._add_violation
+
+    def __init__(self, match):
+        self.db = self.connect(SINK_DB)
+
+    @classmethod
+    def connect(cls, filename, timeout=SINK_DB_TIMEOUT):
+        """Open (or create) a results database, return the connection
+
+        A database of another schema version (SINK_DB_VERSION) is refused.
+
+        Arguments:
+        filename -- the database file
+        timeout -- seconds to wait for a database locked by another writer
+
+        Exceptions: sqlite3.Error
+        """
+        db = sqlite3.connect(filename, timeout=timeout,
+                             check_same_thread=False)  # SinkWriter
+        try:
+            version, = db.execute('PRAGMA user_version').fetchone()
+            tables, = db.execute("SELECT COUNT(*) FROM sqlite_master"
+                                 " WHERE type = 'table'").fetchone()
+            if version != SINK_DB_VERSION and (version or tables):
+                raise sqlite3.DatabaseError(
+                        '{}: results database version {}, expected {}'
+                        .format(filename, version, SINK_DB_VERSION))
+            db.executescript(cls.SCHEMA)
+        except sqlite3.Error:
+            db.close()
+            raise
+        return db
+
+    def game(self, record):
+        with self.db:
+            self.store(self.db, record)
+
+    @classmethod
+    def store(cls, db, record):
+        """Write a game record, replacing the game if present
+
+        The caller manages the transaction.
+
+        Arguments:
+        db -- a connection returned by connect()
+        record -- a game record (see Match.game_record)
+        """
+        key = (record['match'], record['game'])
+        players = {BLACK: record['black'], WHITE: record['white']}
+        moves = []
+        for num, move in enumerate(record['move_list'], 1):
+            color = BLACK if num % 2 else WHITE
+            moves.append(key + (num, players[color], color) + tuple(move))
+        violations = [key + (name, int(num), float(secs))
+                      for name, num, secs
+                      in cls.VIO_RE.findall(record['violations'] or '')]
+        for table in ('moves', 'violations'):
+            db.execute('DELETE FROM {} WHERE match = ? AND game = ?'
+                       .format(table), key)
+        db.execute('INSERT OR REPLACE INTO games VALUES (?,?,?,?,?,?,?,?,?)',
+                   key + (record['time'], record['white'], record['black'],
+                          record['winner'], record['reason'],
+                          record['moves'], record['violations']))
+        db.executemany('INSERT INTO moves VALUES (?,?,?,?,?,?,?,?,?)', moves)
+        db.executemany('INSERT INTO violations VALUES (?,?,?,?,?)',
+                       violations)
+
+    def close(self):
+        self.db.close()
+
+
+SINK_TYPES = {'text': TextSink, 'archive': ArchiveSink, 'jsonl': JsonSink,
+              'sqlite': SqliteSink, 'null': ResultSink}
+SINK_ERRORS = (OSError, ValueError) + ((sqlite3.Error,) if sqlite3 else ())
+
+
+class SinkWriter:
+    """Feeds a ResultSink from a thread of its own
+
+    Calls are queued without limit, so a slow sink cannot hold up play. If
+    the sink fails, it gets no more calls; the error is kept in error (see
+    Match.check_sinks).
+    """
+    def __init__(self, name, sink):
+        """Start the writer thread
+
+        Arguments:
+        name -- the sink's name (see Sinks)
+        sink -- the ResultSink
+        """
+        self.name = name
+        self.sink = sink
+        self.error = None
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(name='sink-' + name,
+                                       target=self._w_loop, daemon=True)
+        self.thread.start()
+
+    def put(self, method, *args):
+        """Queue a call of the sink's method (name) with args"""
+        self.queue.put((method, args))
+
+    def _w_loop(self):
+        """Thread: make the queued calls, close the sink at the end"""
+        while True:
+            method, args = self.queue.get()
+            if method is None:
+                break
+            if not self.error:
+                self._call(getattr(self.sink, method), *args)
+        if not self.error:
+            self._call(self.sink.close)
+            return
+        try:
+            self.sink.close()
+        except SINK_ERRORS:
+            pass  # already reported
+
+    def _call(self, func, *args):
+        try:
+            func(*args)
+        except SINK_ERRORS as e:
+            self.error = e
+            print_err('Result sink "{}" failed: {}'.format(self.name, e))
+
+    def close(self):
+        """Make the queued calls, close the sink, and wait for that"""
+        self.put(None)
+        self.thread.join()
+
+
+class Match:
+    """Plays whole matches, stores settings, manages context
+
+    Context manager managing ManagedEngine instances, the match logfile, and
+    the directories needed (match dir, stderr, SGFs). GTP engines are not
+    created/invoked before the context of a Match is entered. This class
+    ensures (together with ManagedEngine) that all engines are terminated
+    normally or, failing that, killed off before starting another match. If
+    this somehow fails, AllAbort is called, cancelling all further Matches,
+    since a system with processes running wild is likely to prouce skewed match
+    results.
+    """
+    original_nice = None  # niceness before ArbiterNice was applied
+
+    @staticmethod
+    def _chk_name(name):
+        """Check if name follows the rules
+
+        """
+        try:
+            return (name[0] in ENGALW_FRST and len(name) <= ENGALW_MAXC
+                    and set(name) <= set(ENGALW_CHAR) and name[-1:] != '.')
+        except ValueError:
+            pass
+        return False
+
+    def __init__(self, section_name, cnf, blacklist, logs_only=False,
+                 core_slot=0, engine_pool=None):
+        """Initialize a Match from DumbarbConfig and a match section name
+
+        Arguments:
+        section_name -- the match name, name of a section in the config file(s)
+        cnf -- DumbarbConfig instance containing the configuration
+        blacklist -- abort match if one of the engine names is in blacklist
+        logs_only -- only open the match dir and logs when entering the
+                     context, do not start engines (default False)
+        core_slot -- which CoreBudget-sized range of CPUs to use, e.g. 1 for
+                     the second (concurrent tournament matches; default 0)
+        engine_pool -- EnginePool to take engines from and park them in
+                       (tournament matches; default None)
+        """
+        self.logs_only = logs_only
+        self.core_slot = core_slot
+        self.engine_pool = engine_pool
         # set when entering context
         self.estack = None
         self.engines = None
         self.engine_set = None
         self.scorer = None
-        self.log_streams = {}
+        self.sinks = []  # SinkWriters
+        self.output_lock = threading.Lock()  # engines log from threads
         self.match_dir = None
         self.start_with = 1
+        self.results = None  # first engine's (wins, draws, losses) so far
         self.created_sgf_dir = None
         self.created_err_dir = None
 
@@ -1367,22 +3627,39 @@ class Match:
                     time_sys=int(section.get('timesys', 2)))
             self.name = ' '.join(sname_elems)
             usc_name = '_'.join(sname_elems)
-            self.log_filenames = {'result': usc_name + '.log',
-                                  'movetimes': usc_name + '.mvtimes',
-                                  'runlog': usc_name + '.run'}
+            self.shard = cnf.shard
+            log_name = usc_name
+            if self.shard:
+                log_name += FMT_SHARD.format(*self.shard)
+            self.log_base = log_name
+            self.log_filenames = {'result': log_name + '.log',
+                                  'movetimes': log_name + '.mvtimes',
+                                  'runlog': log_name + '.run'}
             self.unchecked_match_dir = usc_name
             self.num_games = int(section.get('numgames', 100))
             self.consec_passes_to_end = int(
                     section.get('consecutivepasses', 2))
+            self.max_moves = int(section.get('maxmoves', 0))
+            self.adj_from = int(section.get('adjudicatefrom', 0))
+            self.adj_every = max(1, int(section.get('adjudicateevery', 10)))
+            self.adj_checks = max(1, int(section.get('adjudicatechecks', 3)))
+            self.adj_cmd = section.get('adjudicatecmd', 'final_score')
+            self.resign_margin = float(section.get('resignmargin', 0))
+            self.draw_margin = float(section.get('drawmargin', 0))
             self.match_wait = float(section.get('matchwait', 1))
-            self.game_wait = float(section.get('gamewait', 0.5))
+            self.game_wait = float(section.get(
+                    'gamewait',
+                    0.5 if sys.platform.startswith('win') else 0))
             self.move_wait = float(section.get('movewait', 0))
             self.time_tol = float(section.get('timetolerance', 0))
             self.scorer_name = section.get('scorer', None)
             self.disable_sgf = section.getboolean('disablesgf', False)
             self.enforce_time = section.getboolean('enforcetime', False)
+            self.pipeline_genmove = section.getboolean('pipelinegenmove',
+                                                       False)
             self.suppress_err = section.getboolean('quiet', False)
             self.log_stderr = section.getboolean('logstderr', True)
+            self.segmented_err = section.getboolean('segmentedstderr', False)
             self.gtp_timeout = float(section.get('gtptimeout', 3))
             self.gtp_init_timeout = max(
                     self.gtp_timeout,
@@ -1391,6 +3668,38 @@ class Match:
             self.gtp_genmove_extra = float(section.get('gtpgenmoveextra', 15))
             self.gtp_genmove_untimed_to = float(
                     section.get('gtpgenmoveuntimedto', 90))
+            self.cpu_hang_window = float(section.get('cpuhangwindow', 0))
+            self.adaptive_to = float(section.get('adaptivetimeouts', 0))
+            self.adaptive_to_min = float(section.get('adaptivetimeoutmin', 1))
+            self.move_cpu_times = section.getboolean('movecputimes', False)
+            self.arbiter_nice = section.get('arbiternice', None)
+            if self.arbiter_nice is not None:
+                self.arbiter_nice = int(self.arbiter_nice)
+            self.core_budget = int(section.get('corebudget', 0))
+            self.sink_names = section.get('sinks', 'text').replace(
+                    ',', ' ').split()
+            for name in self.sink_names:
+                if name not in SINK_TYPES:
+                    raise ValueError('Unknown sink: {}'.format(name))
+            if 'sqlite' in self.sink_names and sqlite3 is None:
+                raise ValueError('sqlite sink: no sqlite3 module')
+            stop_rule = section.get('stoprule', None)
+            self.stop_rule = StopRule(stop_rule) if stop_rule else None
+            if self.stop_rule and self.shard:
+                msg = 'Match [{}]: StopRule ignored when playing a shard'
+                print_err(msg.format(self.name))
+                self.stop_rule = None
+            self.reader_sched = section.get('readersched', None)
+            if self.reader_sched:
+                policy, _, prio = self.reader_sched.partition(':')
+                if policy not in SCHED_POLICIES:
+                    raise ValueError('ReaderSched must be fifo or rr')
+                self.reader_sched = (policy, int(prio or 1))
+            if self.adj_from and not self.scorer_name:
+                raise ValueError('AdjudicateFrom requires a Scorer')
+            if self.adj_from and not (self.resign_margin or self.draw_margin):
+                raise ValueError('AdjudicateFrom requires ResignMargin and/or'
+                                 ' DrawMargin')
         except ValueError as e:
             msg = 'Config value error for match [{match}]:\n{err}'
             raise ConfigError(msg.format(match=section.name, err=e))
@@ -1403,16 +3712,14 @@ class Match:
         self.gtp_debug = cnf.gtp_debug
 
         # set of GTP commands players/scorer are required to support
-        self.req_commands = {'boardsize', 'komi', 'genmove', 'play',
-                             'clear_board', 'quit'}
-        if self.game_settings.time_sys > 0:
-            self.req_commands.add('time_left')
-        if self.game_settings.time_sys == 3:
-            self.req_commands.add('kgs-time_settings')
-        else:
-            self.req_commands.add('time_settings')
+        self.req_commands = self.game_settings.gtp_commands()
         self.req_cmd_scorer = ((self.req_commands | {'final_score'})
                                - {'genmove', 'time_left'})
+        if self.adj_from:
+            self.req_cmd_scorer.add(self.adj_cmd)
+
+        # core budget shares, interpolated into engine command lines
+        self.core_shares = self._share_cores()
 
         # field widths for formatting output
         self.max_dgts = len(str(self.num_games))
@@ -1427,52 +3734,141 @@ class Match:
 
         if os.path.isdir(self.unchecked_match_dir) and self.cont_matches:
             self.match_dir = self.unchecked_match_dir
-            nextgame = self._last_finished_game() + 1
-            if nextgame > self.num_games:
+            last = self._last_finished_game()
+            games = [num for num in range(last + 1, self.num_games + 1)
+                     if self._in_shard(num)]
+            if not games:
+                self.results = logged_results(
+                        os.path.join(self.match_dir,
+                                     self.log_filenames['result']),
+                        self.engine_names)
                 raise MatchAbort('Skipping finished match.')
-            self.start_with = nextgame
+            self.start_with = games[0]
             msg = 'Continuing match [{match}] from game {n}'
             print_err(msg.format(match=self.name, n=self.start_with))
         else:
             self.match_dir = self._mk_match_dir()
         self.estack = contextlib.ExitStack()
+        try:
+            self._enter_stack()
+        except BaseException:
+            self.estack.close()
+            raise
+        return self
 
-        # open results log, move times log, run log; place them onto ExitStack
-        for logname, filename in self.log_filenames.items():
-            fullname = os.path.join(self.match_dir, filename)
-            file = self.estack.enter_context(open(fullname, 'a'))
-            self.log_streams[logname] = file
+    def _enter_stack(self):
+        """Open logs and start engines, placing them onto the ExitStack"""
+        # open result sinks (the results, move times and run logs by
+        # default); place them onto ExitStack
+        self.estack.callback(self._close_sinks)
+        for name in self.sink_names:
+            try:
+                sink = SINK_TYPES[name](self)
+            except SINK_ERRORS as e:
+                msg = 'Cannot open result sink "{}": {}'
+                raise MatchAbort(msg.format(name, e)) from None
+            self.sinks.append(SinkWriter(name, sink))
+        if self.logs_only:
+            self.engine_set = set()
+            if not self.disable_sgf:
+                self.created_sgf_dir = self._mk_sub(SGF_SUBDIR)
+            return
 
-        # start player engines (and scorer, if needed) and place onto ExitStack
+        # start player engines (and scorer, if needed) concurrently, place
+        # their shutdown onto ExitStack
         tos = {'gtp_timeout': self.gtp_timeout,
                'gtp_scorer_to': self.gtp_scorer_to,
                'gtp_genmove_extra': self.gtp_genmove_extra,
                'gtp_genmove_untimed_to': self.gtp_genmove_untimed_to}
-        enter = self.estack.enter_context
-        self.engines = [enter(ManagedEngine(name, self, self._output, **tos))
+        if self.arbiter_nice is not None:
+            self._set_arbiter_priority()
+        self.engines = [ManagedEngine(name, self, self._output, **tos)
                         for name in self.engine_names]
         self.engine_set = set(self.engines)
+        startup_order = list(self.engines)
         if self.scorer_name:
             try:
                 i = self.engine_names.index(self.scorer_name)
                 self.scorer = self.engines[i]
             except ValueError:  # scorer must be started separately
-                self.scorer = enter(ManagedEngine(self.scorer_name, self,
-                                                  self._output, **tos))
+                self.scorer = ManagedEngine(self.scorer_name, self,
+                                            self._output, **tos)
                 self.engine_set.add(self.scorer)
+                startup_order.append(self.scorer)
+        self.estack.push(self._exit_engines)
+        fan_out(lambda engine: engine.__enter__(), startup_order)
 
         # match subdirs
         if not self.disable_sgf:
             self.created_sgf_dir = self._mk_sub(SGF_SUBDIR)
         mk_err_dir = False
-        for engine in self.engines:
+        for engine in self.engine_set:
             if engine.log_stderr:
                 mk_err_dir = True
                 break
         if mk_err_dir:
             self.created_err_dir = self._mk_sub(ERR_SUBDIR)
 
-        return self
+    def _share_cores(self):
+        """Divide the core budget among the players; return {name: share}
+
+        The budget is CoreBudget CPUs available to dumbarb (all of them by
+        default): the first ones, or the next ones for each core_slot (if
+        there are enough CPUs), split into equal, contiguous parts, one per
+        player.
+        An engine only used as scorer (which runs while the players wait)
+        gets the whole budget. A share is a dict with the 'threads', 'cores'
+        and 'numa' fields for command line interpolation.
+        """
+        try:
+            available = sorted(os.sched_getaffinity(0))
+        except AttributeError:  # not Linux
+            available = list(range(os.cpu_count() or 1))
+        size = self.core_budget or len(available)
+        start = self.core_slot * size
+        budget = available[start:start + size] or available[:size]
+        players = len(self.engine_names)
+        size = max(1, len(budget) // players)
+        parts = {name: budget[i * size:(i + 1) * size] or budget[:size]
+                 for i, name in enumerate(self.engine_names)}
+        if self.scorer_name and self.scorer_name not in parts:
+            parts[self.scorer_name] = budget
+        return {name: {'threads': len(cpus),
+                       'cores': format_cpu_list(cpus),
+                       'numa': numa_nodes(cpus)}
+                for name, cpus in parts.items()}
+
+    def _set_arbiter_priority(self):
+        """Set the niceness of all dumbarb threads to ArbiterNice, log it
+
+        The original niceness is kept in Match.original_nice and becomes the
+        default for engines (which would otherwise inherit ArbiterNice).
+        """
+        try:
+            if Match.original_nice is None:
+                Match.original_nice = os.getpriority(os.PRIO_PROCESS, 0)
+            try:
+                tids = [int(tid) for tid in os.listdir('/proc/self/task')]
+            except OSError:  # no /proc: calling thread only
+                tids = [0]
+            for tid in tids:
+                os.setpriority(os.PRIO_PROCESS, tid, self.arbiter_nice)
+            actual = os.getpriority(os.PRIO_PROCESS, 0)
+            result = 'nice {} ({})'.format(
+                    self.arbiter_nice, 'granted' if actual == self.arbiter_nice
+                    else 'not granted, is {}'.format(actual))
+        except (AttributeError, OSError) as e:
+            result = 'nice {} (not granted: {})'.format(self.arbiter_nice, e)
+        msg = ARB_PRIO.format(result)
+        if self.show_diagnostics or 'not granted' in msg:
+            print_err(msg)
+        self._output(msg, fmt=DUMBARB, log='runlog', flush=True)
+
+    def _exit_engines(self, etype, evalue, etrace):
+        """Exit the context of all engines concurrently (shut them down)"""
+        fan_out(lambda engine: engine.__exit__(etype, evalue, etrace),
+                self.engine_set)
+        return False
 
     def __exit__(self, etype, evalue, etrace):
         """Close the ExitStack (ManagedEngines, open logfile)"""
@@ -1485,16 +3881,20 @@ class Match:
 
     def _last_finished_game(self):
         """Return the last fully finished/logged game in the match"""
-        assert self.log_streams == {}
+        assert self.sinks == []
         filename = self.log_filenames['result']
         try:
             with open(os.path.join(self.match_dir, filename)) as log:
                 lines = log.readlines()
+                if lines and lines[-1].startswith(FMT_STOP_PRE):
+                    return self.num_games  # stopped early (StopRule)
                 if not lines:
                     return 0
                 fields = lines[-1].split()
                 num = int(fields[1][1:-1])
-                if num != len(lines):
+                shard_games = [n for n in range(1, num + 1)
+                               if self._in_shard(n)]
+                if num not in shard_games or len(shard_games) != len(lines):
                     msg = ('Cannot continue match: unmatched line'
                            '/game number in results log')
                     raise MatchAbort(msg)
@@ -1505,6 +3905,50 @@ class Match:
             msg = 'Cannot continue (-c) match: {}'
             raise MatchAbort(msg.format(e)) from None
 
+    def _in_shard(self, game_num):
+        """Return True if game_num is played by this shard (or no --shard)
+
+        Shard i of n plays games i, i + n, i + 2n, etc.
+
+        Arguments:
+        game_num -- the game number in the match
+        """
+        if not self.shard:
+            return True
+        index, count = self.shard
+        return (game_num - 1) % count == index - 1
+
+    def _logged_results(self):
+        """Return the first engine's (wins, draws, losses) from the log
+
+        Counts the games already in the results log (continued matches);
+        games without a winner count as draws.
+        """
+        if self.start_with <= 1:
+            return (0, 0, 0)
+        filename = os.path.join(self.match_dir, self.log_filenames['result'])
+        return logged_results(filename, self.engine_names)
+
+    def check_stop_rule(self, results, game_num):
+        """Evaluate StopRule; on a verdict, record it and return True
+
+        The verdict goes to the results log (as a line starting with
+        FMT_STOP_PRE, which also marks the match finished for -c), the run
+        log and the console. At the end of the match, the inconclusive
+        status is reported instead.
+
+        Arguments:
+        results -- (wins, draws, losses) of the first engine so far
+        game_num -- the number of the game just finished
+        """
+        stop, msg = self.stop_rule.check(*results, self.engine_names)
+        if stop:
+            self._output(FMT_STOP_PRE + 'Stopped: ' + msg + '\n', flush=True)
+        if stop or game_num == self.num_games:
+            self._output(msg, fmt=DUMBARB, log='runlog', flush=True)
+            print_err(('\n' if self.show_progress else '') + msg)
+        return stop
+
     def _mk_match_dir(self):
         """Make & return match dir, append -001, -002, etc. if it exists"""
         try_dir = self.unchecked_match_dir
@@ -1554,25 +3998,75 @@ class Match:
         print_err(char + end, skipformat=True)
 
     def _output(self, message, flush=False, log='result', fmt=None):
-        """Write to one of the output streams, optionally flush
+        """Write to one of the logs (in all result sinks), optionally flush
 
         Arguments:
         message -- string to write
         flush -- whether to flush (default False)
-        log -- the output stream (default 'result')
+        log -- the log: 'result', 'movetimes' or 'runlog' (default 'result')
         fmt -- if present: timestamp, prefix with fmt string and add a newline
         """
-        stream = self.log_streams[log]
         if fmt:
             stamp = datetime.datetime.now().strftime('%y%m%d-%H:%M:%S')
             message = '{stamp} {fmt}: {msg}\n'.format(stamp=stamp,
                                                       fmt=fmt, msg=message)
-        stream.write(message)
-        if flush:
-            stream.flush()
+        with self.output_lock:  # same order in all sinks
+            for writer in self.sinks:
+                writer.put('write', log, message, flush)
+
+    def _close_sinks(self):
+        """Close the result sinks after their queued output is written"""
+        sinks, self.sinks = self.sinks, []
+        for writer in sinks:
+            writer.close()
+
+    def check_sinks(self):
+        """Raise MatchAbort if a result sink has failed"""
+        for writer in self.sinks:
+            if writer.error:
+                msg = 'Result sink "{}" failed: {}'
+                raise MatchAbort(msg.format(writer.name, writer.error))
+
+    def game_record(self, game_num, game):
+        """Return a dict describing a finished game (for result sinks)
+
+        The keys are match, game (number), time (ISO 8601), white, black
+        (names), winner (BLACK, WHITE or a RESULT_* value), reason (as in
+        the results log), moves (count), violations (as in the results log,
+        None if none), engines ({name: {color, moves, max_time,
+        total_time}} for the players) and move_list ([coord, seconds, user
+        CPU, system CPU] per move; CPU times None unless MoveCpuTimes).
+
+        Arguments:
+        game_num -- the game number in the match
+        game -- the Game object of a finished game
+        """
+        moves = [[coord, secs] + list(cpu if cpu else (None, None))
+                 for coord, secs, cpu
+                 in zip(game.move_list, game.move_times, game.move_cpu)]
+        return {'match': self.name,
+                'game': game_num,
+                'time': datetime.datetime.now().isoformat(
+                        timespec='seconds'),
+                'white': game.white_engine.name,
+                'black': game.black_engine.name,
+                'winner': game.winner,
+                'reason': str(game.win_reason),
+                'moves': game.num_moves,
+                'violations': game.time_vio_str,
+                'engines': {engine.name: {
+                                'color': engine.color,
+                                'moves': engine.moves_made,
+                                'max_time':
+                                    engine.max_time_taken.total_seconds(),
+                                'total_time':
+                                    engine.total_time_taken.total_seconds()}
+                            for engine in self.engines},
+                'move_list': moves}
 
     def _output_move_times(self, game_num, game):
-        """Output move numbers, coordinates and times to the movetime log
+        """Output move numbers, coordinates and times to the movetime log,
+        return the entry
 
         Arguments:
         game_num -- the game number in the match
@@ -1583,24 +4077,30 @@ class Match:
         times = [FMT_MVTIME.format(mvnum=str(n), coord=str(m), time=str(t))
                  for n, m, t
                  in zip(range(1, numm + 1), game.move_list, game.move_times)]
+        if self.move_cpu_times:
+            for i, cpu in enumerate(game.move_cpu):
+                user, system = (('{:.3f}'.format(x) for x in cpu) if cpu
+                                else ('-', '-'))
+                times[i] += FMT_MVCPU.format(user=user, sys=system)
         entry = FMT_MTENTRY.format(seqno=game_num,
                                    swidth=self.max_dgts,
                                    mvs=' '.join(times))
         self._output(entry, log='movetimes', flush=True)
+        return entry
 
     def _output_result(self, game_num, game):
-        """Write a result line to the 'result' output stream
+        """Write a result line to the 'result' output stream, return it
 
         Arguments:
         game_num -- the game number in the match
         game -- the Game object of a finished game
         """
         stamp = datetime.datetime.now().strftime('%y%m%d-%H:%M:%S')
-        self._output(FMT_PRE_RES.format(
+        line = FMT_PRE_RES.format(
                 stamp=stamp, seqno=game_num,
                 swidth=self.max_dgts, nwidth=self.n_width,
                 name1=self.engines[0].name, col1=self.engines[0].color,
-                name2=self.engines[1].name, col2=self.engines[1].color))
+                name2=self.engines[1].name, col2=self.engines[1].color)
 
         eng_stats = []
         for engine in self.engines:
@@ -1615,15 +4115,15 @@ class Match:
                               'avgtt': avgtt,
                               'moves': engine.moves_made})
         if game.winner == WHITE:
-            self._output(FMT_WIN_W.format(
-                    name=game.white_engine.name, nwidth=self.n_width))
+            line += FMT_WIN_W.format(
+                    name=game.white_engine.name, nwidth=self.n_width)
         elif game.winner == BLACK:
-            self._output(FMT_WIN_B.format(
-                    name=game.black_engine.name, nwidth=self.n_width))
+            line += FMT_WIN_B.format(
+                    name=game.black_engine.name, nwidth=self.n_width)
         else:
-            self._output(FMT_ALT_RES.format(
-                    result=game.winner, nwidth=self.n_width))
-        out_rest = FMT_REST.format(
+            line += FMT_ALT_RES.format(
+                    result=game.winner, nwidth=self.n_width)
+        line += FMT_REST.format(
                 name1=eng_stats[0]['name'],
                 maxtt1=eng_stats[0]['maxtt'],
                 tottt1=eng_stats[0]['tottt'],
@@ -1638,7 +4138,8 @@ class Match:
                 reason=game.win_reason,
                 vio=game.time_vio_str if game.time_vio_str else VIO_NONE,
                 nwidth=self.n_width)
-        self._output(out_rest, flush=True)
+        self._output(line, flush=True)
+        return line
 
     def _output_match_stats(self):
         """Output overall match stats, calling engines' output_match_stats()"""
@@ -1647,22 +4148,71 @@ class Match:
             engine.output_match_stats()
 
     def _write_sgf(self, game_num, game):
-        """Save an SGF file for a game
+        """Save an SGF file for a game, return its name (None if not saved)
 
         Arguments:
         game_num -- the game number in the match
         game -- the Game object of a finished game
         """
         if self.disable_sgf:
-            return
+            return None
         sgf_file = FN_FORMAT.format(num=game_num, ext='sgf')
         sgf_wr = SgfWriter(self.game_settings,
                            game.white_engine.name, game.black_engine.name,
                            'game {}'.format(game_num),
                            'dumbarb {}-game match'.format(self.num_games))
         sgf_wr.add_move_list(game.move_list, game.move_times)
-        sgf_wr.set_result(game.winner, game.win_reason)
-        sgf_wr.write_file(sgf_file, self.created_sgf_dir)
+        if game.win_reason in (REASON_ADJU, REASON_MAXM):
+            sgf_wr.set_result(game.winner, game.adj_margin, game.adj_comment)
+        else:
+            sgf_wr.set_result(game.winner, game.win_reason)
+        if sgf_wr.write_file(sgf_file, self.created_sgf_dir):
+            return os.path.join(self.created_sgf_dir, sgf_file)
+        return None
+
+    def _begin_err_logs(self, game_num):
+        """Set up stderr logging for a game: new files or new segments
+
+        Arguments:
+        game_num -- the game number in the match
+        """
+        for engine in self.engine_set:
+            if not engine.log_stderr:
+                continue
+            if engine.segmented_err:
+                engine.begin_err_segment(
+                        os.path.join(self.created_err_dir,
+                                     ERR_SEG_LOG.format(name=engine.name)),
+                        os.path.join(self.created_err_dir,
+                                     ERR_SEG_IDX.format(name=engine.name)))
+                continue
+            fname = FN_FORMAT.format(num=game_num, ext=engine.name + '.log')
+            err_fullfn = os.path.join(self.created_err_dir, fname)
+            if os.path.exists(err_fullfn):
+                for i in range(1, 10000):
+                    try_name = (err_fullfn.replace('.log', '')
+                                + '-{0:03}.log'.format(i))
+                    if not os.path.exists(try_name):
+                        break
+                os.rename(err_fullfn, try_name)
+            engine.set_err_file(err_fullfn)
+
+    def _end_err_logs(self, game_num):
+        """Drain engine stderr after a game, close segments in segmented mode
+
+        Arguments:
+        game_num -- the game number in the match
+        """
+        for engine in self.engine_set:
+            engine.log_err_lag(game_num)
+            if not engine.log_stderr:
+                continue
+            if not engine.drain_err():
+                msg = ('[{}] stderr not drained in time; game logs may be'
+                       ' desynced')
+                print_err(msg.format(engine.name))
+            if engine.segmented_err:
+                engine.end_err_segment(game_num)
 
     def play(self):
         """Run the match"""
@@ -1673,40 +4223,93 @@ class Match:
         if self.match_wait:
             time.sleep(self.match_wait)
 
+        # results of previous sessions (-c), for StopRule and tournaments
+        logged = self._logged_results()
+        self.results = logged
+
         # match loop
-        if self.start_with & 1:
+        first, second = self.engines
+        for game_num in range(self.start_with, self.num_games + 1):
+            if not self._in_shard(game_num):
+                continue
+            self.play_game(game_num)
+            wins = logged[0] + first.stats[0]
+            losses = logged[2] + second.stats[0]
+            games = sum(logged) + first.stats[1]
+            self.results = (wins, games - wins - losses, losses)
+            if self.stop_rule and self.check_stop_rule(self.results,
+                                                       game_num):
+                break
+            if game_num < self.num_games:
+                for engine in self.engine_set:
+                    engine.check_memory(game_num)
+            self._print_indicator(game_num)
+        self.finish()
+
+    def play_game(self, game_num):
+        """Play and log a game; return {'result', 'movetimes', 'sgf', 'data'}
+
+        The first engine is W in odd-numbered games. The returned dict holds
+        the results log line, the move times log entry, the name of the SGF
+        file (None if not saved) and the game record (see game_record).
+
+        Arguments:
+        game_num -- the game number in the match
+        """
+        if game_num & 1:
             white, black = self.engines
         else:
             black, white = self.engines
-        for game_num in range(self.start_with, self.num_games + 1):
-            if self.game_wait:
-                time.sleep(self.game_wait)
-            for engine in self.engine_set:
-                if engine.log_stderr:
-                    fname = FN_FORMAT.format(
-                            num=game_num, ext=engine.name + '.log')
-                    err_fullfn = os.path.join(self.created_err_dir, fname)
-                    if os.path.exists(err_fullfn):
-                        for i in range(1, 10000):
-                            try_name = (err_fullfn.replace('.log', '')
-                                        + '-{0:03}.log'.format(i))
-                            if not os.path.exists(try_name):
-                                break
-                        os.rename(err_fullfn, try_name)
-                    engine.set_err_file(err_fullfn)
-            game = Game(white, black, self)
-            game.play()
-            self._output_result(game_num, game)
-            self._output_move_times(game_num, game)
-            self._write_sgf(game_num, game)
-            for engine in self.engines:
-                engine.add_game_result_to_stats(game)
-            self._print_indicator(game_num)
-            white, black = black, white
+        if self.game_wait:
+            time.sleep(self.game_wait)
+        self._begin_err_logs(game_num)
+        for engine in self.engines:
+            engine.begin_game_resources()
+        game = Game(white, black, self)
+        game.play()
+        for engine in self.engines:
+            engine.log_game_resources(game_num)
+        self._end_err_logs(game_num)
+        record = {'result': self._output_result(game_num, game),
+                  'movetimes': self._output_move_times(game_num, game),
+                  'sgf': self._write_sgf(game_num, game),
+                  'data': self.game_record(game_num, game)}
+        for writer in self.sinks:
+            writer.put('game', record['data'])
+        for engine in self.engines:
+            engine.add_game_result_to_stats(game)
+        if self.adaptive_to:
+            self.cnf.save_learned_timeouts()
+        self.check_sinks()
+        return record
 
-        # match end
-        for engine in self.engine_set:
-            engine.postmatch()
+    def write_record(self, game_num, record, worker):
+        """Write a game played by a worker to the logs (coordinator)
+
+        Arguments:
+        game_num -- the game number in the match
+        record -- dict with the 'result' line, 'movetimes' entry, 'sgf'
+                  file contents (or None) and 'data' (the game record)
+        worker -- the name of the worker that played the game
+        """
+        self._output(record['result'], flush=True)
+        self._output(record['movetimes'], log='movetimes', flush=True)
+        for writer in self.sinks:
+            writer.put('game', record['data'])
+        if record['sgf'] is not None and self.created_sgf_dir:
+            sgf_file = os.path.join(self.created_sgf_dir,
+                                    FN_FORMAT.format(num=game_num, ext='sgf'))
+            with open(sgf_file, 'w', encoding='utf-8') as file:
+                file.write(record['sgf'])
+        msg = 'Game {num} played by worker {worker}'
+        self._output(msg.format(num=game_num, worker=worker), fmt=DUMBARB,
+                     log='runlog', flush=True)
+        self._print_indicator(game_num)
+        self.check_sinks()
+
+    def finish(self):
+        """Run postmatch commands and output match stats"""
+        fan_out(lambda engine: engine.postmatch(), self.engine_set)
         self._output_match_stats()
 
 
@@ -1731,6 +4334,29 @@ class Game:
         self.time_vio_str = None
         self.move_list = []
         self.move_times = []
+        self.move_cpu = []  # (user, sys) CPU secs per move or None
+        self.adj_margin = None  # } score margin & description of adjudicated
+        self.adj_comment = None  # } or MaxMoves games (for SGF)
+        self._adj_lead = (None, 0)  # (leading color, consecutive checks)
+        self._adj_draw = 0  # consecutive checks within DrawMargin
+        self._scorer_sync = (None, 0)  # (scorer resp_queue, moves sent)
+
+    @staticmethod
+    def _parse_score(score):
+        """Return (winner, margin) from a GTP score, or None if malformed
+
+        Arguments:
+        score -- a score as returned by final_score, e.g. B+3.5 or 0; any
+                 text after the first word (e.g. estimate bounds) is ignored
+        """
+        try:
+            if score[0] == '0':
+                return RESULT_JIGO, REASON_JIGO
+            if score[0] in [BLACK, WHITE] and score[1] == '+':
+                return score[0], score[2:].split()[0]
+        except IndexError:
+            pass
+        return None
 
     def _score_game(self):
         """Return (winner, win_reason) as calculated by scorer
@@ -1746,7 +4372,9 @@ class Game:
             restarted = False
             while True:
                 try:
-                    if scr_not_playing or restarted:
+                    if scr_not_playing:
+                        self._sync_scorer(scr)
+                    elif restarted:
                         scr.pregame_setup()
                         scr.play_move_list(self.move_list)
                     score = scr.final_score()
@@ -1762,18 +4390,125 @@ class Game:
                     scr.restart(reason='scorer could not score game')
                     restarted = True
                     continue
-                try:
-                    if score[0] == '0':
-                        return RESULT_JIGO, REASON_JIGO
-                    if score[0] in [BLACK, WHITE] and score[1] == '+':
-                        return score[0], score[2:]
-                except IndexError:
-                    pass
+                result = self._parse_score(score)
+                if result:
+                    return result
                 msg = 'Could not score game. Bad score format from {}:'
                 print_err(msg.format(scr.name), sub=score)
                 return RESULT_NONE, REASON_SCOR
         return RESULT_NONE, REASON_NONE
 
+    def _sync_scorer(self, scr):
+        """Send the moves a scorer that is not playing does not have yet
+
+        The first time in a game, and whenever the scorer has a new process
+        (restarted) or an earlier update failed, it is set up for a new game
+        and gets all the moves; otherwise only the moves since the last call.
+
+        Arguments:
+        scr -- the scorer
+        """
+        queue_id, sent = self._scorer_sync
+        self._scorer_sync = (None, 0)  # until the update succeeds
+        if queue_id is not scr.resp_queue:
+            scr.pregame_setup()
+            sent = 0
+        scr.play_move_list(self.move_list[sent:],
+                           first_color=WHITE if sent % 2 else BLACK)
+        self._scorer_sync = (scr.resp_queue, len(self.move_list))
+
+    def _estimate_score(self, move_num):
+        """Return (winner, margin) from the scorer's AdjudicateCmd, or None
+
+        A scorer that is not playing is brought up to the moves so far (see
+        _sync_scorer). None is returned if the scorer cannot (or failed to)
+        estimate the score.
+
+        Arguments:
+        move_num -- the number of the last move (for messages)
+        """
+        scr = self.match.scorer
+        playing = scr in (self.white_engine, self.black_engine)
+        try:
+            if not playing:
+                self._sync_scorer(scr)
+            score = scr.get_response_for(self.match.adj_cmd,
+                                         timeout=scr.gtp_scorer_to)
+        except GtpCannotScore:
+            return None
+        except GtpException as e:
+            msg = 'Could not adjudicate move #{mvnum}. GTP error from {name}:'
+            print_err(msg.format(mvnum=move_num, name=scr.name), sub=e)
+            scr.restart(reason='scorer could not estimate score')
+            if playing:
+                scr.pregame_setup(scr.color)
+                scr.play_move_list(self.move_list)
+            return None
+        result = self._parse_score(score)
+        if not result:
+            msg = 'Could not adjudicate move #{mvnum}. Bad score from {name}:'
+            print_err(msg.format(mvnum=move_num, name=scr.name), sub=score)
+        return result
+
+    def _adjudicate(self, move_num):
+        """Check the score estimate, if due; set the result and return True
+        if the game can be adjudicated
+
+        Checks are due every AdjudicateEvery moves from move AdjudicateFrom.
+        A game is won when the same player leads by at least ResignMargin
+        (and drawn when the margin is within DrawMargin) for AdjudicateChecks
+        consecutive checks.
+
+        Arguments:
+        move_num -- the number of the last move
+        """
+        match = self.match
+        if not match.adj_from or move_num < match.adj_from \
+                or (move_num - match.adj_from) % match.adj_every:
+            return False
+        result = self._estimate_score(move_num)
+        if result is None:
+            return False
+        winner, margin = result
+        try:
+            points = 0 if winner == RESULT_JIGO else abs(float(margin))
+        except ValueError:
+            return False
+        lead, count = self._adj_lead
+        if match.resign_margin and winner in (BLACK, WHITE) \
+                and points >= match.resign_margin:
+            self._adj_lead = (winner, count + 1 if lead == winner else 1)
+        else:
+            self._adj_lead = (None, 0)
+        if match.draw_margin and points <= match.draw_margin:
+            self._adj_draw += 1
+        else:
+            self._adj_draw = 0
+        score = '0' if winner == RESULT_JIGO else winner + '+' + margin
+        msg = 'adjudicated by {name} after move {mvnum} (estimate: {score})'
+        if self._adj_lead[1] >= match.adj_checks:
+            self.winner, self.adj_margin = winner, margin
+        elif self._adj_draw >= match.adj_checks:
+            self.winner = RESULT_JIGO
+        else:
+            return False
+        self.win_reason = REASON_ADJU
+        self.adj_comment = msg.format(name=match.scorer.name, mvnum=move_num,
+                                      score=score)
+        return True
+
+    def _end_at_max_moves(self):
+        """Set the result of a game that reached MaxMoves (scored if possible)
+        """
+        winner, margin = self._score_game()
+        self.winner, self.win_reason = winner, REASON_MAXM
+        if winner in (BLACK, WHITE):
+            self.adj_margin = margin
+        msg = 'MaxMoves ({}) reached'.format(self.match.max_moves)
+        if self.match.scorer:
+            msg += '; scored by ' + self.match.scorer.name
+        self.adj_comment = msg
+
     def _place_move(self, placer, move_num, move):
         restarted = False
         while True:
@@ -1803,7 +4538,12 @@ class Game:
             except GtpException as e:
                 msg = 'GTP error with {name} while generating move #{mvnum}:'
                 print_err(msg.format(name=mover.name, mvnum=move_num), sub=e)
-                mover.restart(reason='Error while generating move')
+                if isinstance(e, GtpHang):
+                    mover.restart(severity=ENGINE_HANG_SEVERITY,
+                                  reason='Hung while generating move: '
+                                         + str(e))
+                else:
+                    mover.restart(reason='Error while generating move')
                 restarted = True
 
     def _add_violation(self, mover, move_num, delta):
@@ -1857,9 +4597,9 @@ class Game:
         consec_passes = 0
         move_num = 0
         mover = self.black_engine
-        mover.pregame_setup(BLACK)
         placer = self.white_engine
-        placer.pregame_setup(WHITE)
+        colors = {mover: BLACK, placer: WHITE}
+        fan_out(lambda engine: engine.pregame_setup(colors[engine]), colors)
         while True:
             move_num += 1
             if mover.move_wait:
@@ -1868,6 +4608,7 @@ class Game:
             self._check_move(mover, move_num, move)
             self.move_list.append(move)
             self.move_times.append(delta.total_seconds())
+            self.move_cpu.append(mover.last_move_cpu)
             if is_time_violation:
                 self._add_violation(mover, move_num, delta)
                 if self.match.enforce_time:
@@ -1892,9 +4633,525 @@ class Game:
                         sub=e)
                 self.winner, self.win_reason = RESULT_UFIN, REASON_ILMV
                 break
+            if move_num == self.match.max_moves:
+                self._end_at_max_moves()
+                break
+            if self._adjudicate(move_num):
+                break
             mover, placer = placer, mover
-        for engine in mover, placer:
-            engine.postgame(self.move_list)
+        fan_out(lambda engine: engine.postgame(self.move_list),
+                (mover, placer))
+
+
+class GameRules:
+    """Match settings for games played with the asyncio API
+
+    Has what Game uses of a Match, with the defaults of a match section
+    (see CONFIG.md); pass the same GameSettings object as to the engines.
+    """
+    def __init__(self, settings=None, scorer=None, consecutive_passes=2,
+                 enforce_time=False, max_moves=0, adj_from=0, adj_every=10,
+                 adj_checks=3, adj_cmd='final_score', resign_margin=0,
+                 draw_margin=0, name='async'):
+        """Construct GameRules
+
+        Arguments:
+        settings -- a GameSettings object (default: a new one)
+        scorer -- a started AsyncEngine for scoring, may be one of the
+                  players (default None: games ending with passes are not
+                  scored)
+        consecutive_passes -- passes that end the game (default 2)
+        enforce_time -- time violations lose the game (default False)
+        max_moves -- game length limit, 0 for none (default 0)
+        adj_from, adj_every, adj_checks, adj_cmd, resign_margin,
+        draw_margin -- adjudication by the scorer (default off; see
+                       AdjudicateFrom etc. in CONFIG.md)
+        name -- name used in messages (default 'async')
+        """
+        self.game_settings = settings if settings else GameSettings()
+        self.scorer = scorer
+        self.consec_passes_to_end = consecutive_passes
+        self.enforce_time = enforce_time
+        self.max_moves = max_moves
+        self.adj_from = adj_from
+        self.adj_every = adj_every
+        self.adj_checks = adj_checks
+        self.adj_cmd = adj_cmd
+        self.resign_margin = resign_margin
+        self.draw_margin = draw_margin
+        self.name = name
+
+
+class Tournament:
+    """Expands a tournament section into matches and schedules them
+
+    Each pairing becomes a match section named [<engine1> <engine2> <label>],
+    with the values of the tournament section (see DumbarbConfig.
+    add_match_section). Up to Concurrency matches are played at the same
+    time, preferring matches whose engines are not busy. Unless ReuseEngines
+    is off, an engine's process is kept from one match to the next one that
+    it plays in (see EnginePool). Finished matches are skipped on -c, as
+    usual; Swiss pairings are recomputed from their results logs.
+    """
+    def __init__(self, section_name, cnf):
+        """Construct a Tournament from its config section
+
+        Arguments:
+        section_name -- the tournament section name ([* <label>])
+        cnf -- the DumbarbConfig object
+
+        Exceptions: ConfigError
+        """
+        self.cnf = cnf
+        self.name = section_name
+        section = cnf[section_name]
+        try:
+            self.label = section_name.split()[1]
+            if len(section_name.split()) != 2:
+                raise ValueError('The label must be one word')
+            self.engines = section['engines'].split()
+            self.format = section.get('format', 'roundrobin').lower()
+            if self.format not in TOURNEY_FORMATS:
+                raise ValueError('Format must be one of: '
+                                 + ', '.join(TOURNEY_FORMATS))
+            if len(set(self.engines)) != len(self.engines) \
+                    or len(self.engines) < 2:
+                raise ValueError('Engines must list 2 or more engines')
+            self.num_rounds = int(section.get(
+                    'rounds', math.ceil(math.log2(len(self.engines)))))
+            self.concurrency = max(1, int(section.get('concurrency', 1)))
+            self.reuse_engines = section.getboolean('reuseengines', True)
+        except (IndexError, KeyError, ValueError) as e:
+            msg = 'Config value error for tournament [{name}]:\n{err}'
+            raise ConfigError(msg.format(name=section_name, err=e)) from None
+        self.values = {key: val for key, val in cnf.own_items(section_name)
+                       .items() if key not in TOURNEY_KEYS}
+        budget = int(section.get('corebudget', 0))
+        if budget:  # the budget is for the whole tournament
+            self.values['corebudget'] = str(max(1, budget // self.concurrency))
+        self.byes = collections.Counter()  # Swiss byes (engine: count)
+        self.played = []  # section names of matches started so far
+        self.results = {}  # section name: first engine's (wins, draws,
+        #                    losses), as reported by run_match
+
+    def _pairings(self):
+        """Yield lists of pairings, one list per batch of matches
+
+        Round-robin pairings are ordered by round (circle method), so that
+        neighbouring matches have different engines; gauntlet pairs the first
+        engine with each of the others. A Swiss round is only paired once the
+        previous round has finished.
+        """
+        engines = self.engines
+        if self.format == 'gauntlet':
+            yield [(engines[0], opp) for opp in engines[1:]]
+        elif self.format == 'roundrobin':
+            circle = engines + [None] * (len(engines) % 2)
+            pairs = []
+            for _ in range(len(circle) - 1):
+                half = len(circle) // 2
+                pairs += [(a, b) for a, b in zip(circle[:half],
+                                                 circle[:half - 1:-1])
+                          if a and b]
+                circle = circle[:1] + circle[-1:] + circle[1:-1]
+            yield pairs
+        else:
+            played = set()
+            for _ in range(self.num_rounds):
+                pairs = self._swiss_round(played)
+                if not pairs:
+                    return
+                played.update(frozenset(pair) for pair in pairs)
+                yield pairs
+
+    def _swiss_round(self, played):
+        """Return the pairings of the next Swiss round
+
+        Engines are ranked by points (and config order); each engine is
+        paired with the highest ranked engine it has not played yet, as long
+        as the rest can still be paired without rematches (otherwise,
+        rematches are allowed). With an odd number of engines, the lowest
+        ranked engine with the fewest byes sits out and gets a point.
+
+        Arguments:
+        played -- set of frozensets of pairs that have already played
+        """
+        points = self.standings()
+        ranked = sorted(self.engines, key=lambda eng: -points[eng][0])
+        if len(ranked) % 2:
+            bye = min(reversed(ranked), key=lambda eng: self.byes[eng])
+            ranked.remove(bye)
+            self.byes[bye] += 1
+
+        def pair_up(rest):
+            if not rest:
+                return []
+            for opp in rest[1:]:
+                if frozenset((rest[0], opp)) not in played:
+                    pairs = pair_up([eng for eng in rest[1:] if eng != opp])
+                    if pairs is not None:
+                        return [(rest[0], opp)] + pairs
+            return None
+
+        pairs = pair_up(ranked)
+        if pairs is None:
+            pairs = list(zip(ranked[::2], ranked[1::2]))
+        return pairs
+
+    def _match_name(self, pair):
+        """Return the match section name for a pairing"""
+        return '{} {} {}'.format(pair[0], pair[1], self.label)
+
+    def standings(self):
+        """Return {engine: (points, match count, wins, games)} so far
+
+        A match is worth a point for the engine that won more games (half a
+        point each if tied); a Swiss bye is worth a point.
+        """
+        stats = {eng: [self.byes[eng], 0, 0, 0] for eng in self.engines}
+        for sname in self.played:
+            names = sname.split()[:2]
+            wins, draws, losses = self.results.get(sname, (0, 0, 0))
+            if not wins + draws + losses:
+                continue
+            for name, won, lost in ((names[0], wins, losses),
+                                    (names[1], losses, wins)):
+                stat = stats[name]
+                stat[0] += 1 if won > lost else 0.5 if won == lost else 0
+                stat[1] += 1
+                stat[2] += won
+                stat[3] += wins + draws + losses
+        return {eng: tuple(stat) for eng, stat in stats.items()}
+
+    def run(self, run_match):
+        """Play the tournament, print standings; return aborted match count
+
+        Arguments:
+        run_match -- function playing a match, given its section name,
+                     core slot, results dict and EnginePool (or None; see
+                     the run_match function); returns 1 if the match was
+                     aborted, else 0
+
+        Exceptions: AllAbort, KeyboardInterrupt
+        """
+        msg = '============ tournament [{}] ============'
+        print_err(msg.format(self.name))
+        msg = '{fmt}: {engines}; up to {conc} concurrent match(es)'
+        print_err(msg.format(fmt=self.format, engines=' '.join(self.engines),
+                             conc=self.concurrency))
+        aborted = 0
+        pool = EnginePool() if self.reuse_engines else None
+        try:
+            for pairs in self._pairings():
+                snames = [self._match_name(pair) for pair in pairs]
+                for sname in snames:
+                    self.cnf.add_match_section(sname, self.values)
+                self.played += [sname for sname in snames
+                                if sname not in self.played]
+                aborted += self._run_batch(snames, run_match, pool)
+        finally:
+            if pool:
+                pool.close()
+        self._print_standings()
+        return aborted
+
+    def _engine_names(self, sname):
+        """Return the set of engines a match uses (players and scorer)"""
+        names = set(sname.split()[:2])
+        scorer = self.cnf[sname].get('scorer', None)
+        if scorer:
+            names.add(scorer)
+        return names
+
+    def _run_batch(self, snames, run_match, pool):
+        """Play matches, up to Concurrency at a time; return aborted count
+
+        A match whose engines are not busy in another running match is
+        preferred; if there is none, the next match is started anyway. Each
+        running match has its own core slot (0 to Concurrency - 1), so that
+        concurrent matches share the core budget instead of all using the
+        same CPUs. Before matches are started, the parked engines (see
+        EnginePool) that they do not use are shut down.
+
+        Arguments:
+        snames -- list of match section names
+        run_match -- see run()
+        pool -- the tournament's EnginePool, or None
+        """
+        if self.concurrency == 1:
+            aborted = 0
+            for sname in snames:
+                if pool:
+                    pool.retain(self._engine_names(sname))
+                aborted += run_match(sname, 0, self.results, pool)
+            return aborted
+        pending = list(snames)
+        running = {}  # section name: core slot
+        done = queue.Queue()
+        aborted = 0
+
+        def worker(sname, slot):
+            try:
+                done.put((sname, run_match(sname, slot, self.results, pool)))
+            except BaseException as e:  # re-raised in main thread
+                done.put((sname, e))
+
+        while pending or running:
+            starting = []
+            while pending and len(running) < self.concurrency:
+                busy = {eng for sname in running for eng in sname.split()[:2]}
+                sname = next((sname for sname in pending
+                              if not busy & set(sname.split()[:2])),
+                             pending[0])
+                pending.remove(sname)
+                running[sname] = min(set(range(self.concurrency))
+                                     - set(running.values()))
+                starting.append(sname)
+            if pool:
+                pool.retain(set().union(*(self._engine_names(sname)
+                                          for sname in starting)))
+            for sname in starting:
+                threading.Thread(name='match', target=worker,
+                                 args=(sname, running[sname]),
+                                 daemon=True).start()
+            sname, result = done.get()
+            del running[sname]
+            if isinstance(result, BaseException):
+                raise result
+            aborted += result
+        return aborted
+
+    def _print_standings(self):
+        """Print the tournament standings"""
+        standings = self.standings()
+        wid = max(len(eng) for eng in self.engines)
+        print_err('Tournament [{}] standings:'.format(self.name))
+        fmt = ('{rank:2}. {name:{wid}} {pts:5.1f} pts in {mat:2} matches;'
+               ' {wins:4}/{games:4} games won')
+        ranked = sorted(self.engines, key=lambda eng: -standings[eng][0])
+        for rank, eng in enumerate(ranked, 1):
+            pts, mat, wins, games = standings[eng]
+            print_err(fmt.format(rank=rank, name=eng, wid=wid, pts=pts,
+                                 mat=mat, wins=wins, games=games))
+
+
+class Coordinator:
+    """Hands out games to workers and writes the canonical match logs
+
+    Workers (see run_worker) connect over TCP or a Unix socket, receive the
+    session config, and are then assigned games (match name and game number;
+    the game number determines the colors, see Match.play_game) one at a
+    time. A worker keeps playing the same match while it has games left, so
+    that its engines are not restarted. Results, move times and SGF files are
+    written in game order. The games of lost workers are reassigned; a game
+    failing DIST_RETRIES times aborts its match.
+
+    Messages are JSON objects, one per line:
+    worker: {"type": "hello", "worker": <name>}
+    coordinator: {"type": "config", "config": <session config>}
+    worker: {"type": "ready"}
+    coordinator: {"type": "game", "match": <name>, "game": <num>}
+    worker: {"type": "result", "match", "game", "result", "movetimes",
+            "sgf"} or {"type": "error", "match", "game", "error"}
+    ... (until) coordinator: {"type": "done"}
+    """
+    def __init__(self, cnf, blacklist):
+        """Construct a Coordinator object
+
+        Arguments:
+        cnf -- the DumbarbConfig object (loaded)
+        blacklist -- set of names of engines with permanent errors
+        """
+        self.cnf = cnf
+        self.blacklist = blacklist
+        self.estack = contextlib.ExitStack()
+        self.cond = threading.Condition()  # guards all the state below
+        self.matches = {}  # name: Match (logs only)
+        self.todo = {}  # name: deque of game numbers not yet assigned
+        self.next_game = {}  # name: the next game to write to the logs
+        self.received = {}  # name: {game number: record} (out of order)
+        self.tally = {}  # name: first engine's [wins, draws, losses]
+        self.failures = collections.Counter()  # (name, game num): count
+        self.aborted = 0
+        with open(cnf.cnf_file) as cnf_file:
+            self.config_text = cnf_file.read()
+
+    def _open_matches(self):
+        """Open the logs of all match sections (continuing, with -c)"""
+        for sname in self.cnf.match_sections:
+            try:
+                match = Match(sname, self.cnf, self.blacklist, logs_only=True)
+                self.estack.enter_context(match)
+            except (ConfigError, MatchAbort, OSError, ValueError) as e:
+                msg = 'Match [{match}] aborted ({et}):'
+                print_err(msg.format(match=sname, et=e.__class__.__name__),
+                          sub=e)
+                self.aborted += 1
+                continue
+            self.matches[sname] = match
+            self.todo[sname] = collections.deque(
+                    range(match.start_with, match.num_games + 1))
+            self.next_game[sname] = match.start_with
+            self.received[sname] = {}
+            self.tally[sname] = list(match._logged_results()
+                                     if match.stop_rule else (0, 0, 0))
+        if self.cnf.tourney_sections:
+            print_err('Tournaments are not played by workers; skipping: '
+                      + ', '.join(self.cnf.tourney_sections))
+
+    def _end_match(self, sname):
+        """Drop a match that is finished, stopped or aborted"""
+        del self.matches[sname], self.todo[sname], self.next_game[sname]
+        del self.received[sname], self.tally[sname]
+        print_err('Match [{}] ended.'.format(sname))
+        self.cond.notify_all()
+
+    def _assign(self, last):
+        """Return the next (match name, game number); None if all done
+
+        Waits while there are no games left to assign, but some are still
+        being played (their workers could be lost).
+
+        Arguments:
+        last -- the name of the match the worker played last (or None)
+        """
+        with self.cond:
+            while self.matches:
+                names = [last] if self.todo.get(last) else []
+                names += [name for name in self.todo if self.todo[name]]
+                if names:
+                    return names[0], self.todo[names[0]].popleft()
+                self.cond.wait(DIST_POLL)
+            return None
+
+    def _requeue(self, sname, game_num, error=None):
+        """Put back a game of a lost worker, or one failed with error
+
+        Arguments:
+        sname -- the match name
+        game_num -- the game number
+        error -- the worker's error message (default None: lost worker)
+        """
+        with self.cond:
+            if sname not in self.matches:
+                return
+            if error is not None:
+                self.failures[sname, game_num] += 1
+                if self.failures[sname, game_num] >= DIST_RETRIES:
+                    msg = 'Match [{match}] aborted: game {num} failed {n}x'
+                    print_err(msg.format(match=sname, num=game_num,
+                                         n=DIST_RETRIES), sub=error)
+                    self.aborted += 1
+                    self._end_match(sname)
+                    return
+            self.todo[sname].appendleft(game_num)
+            self.cond.notify_all()
+
+    def _complete(self, sname, game_num, record, worker):
+        """Store a worker's game record, write records in game order
+
+        Arguments:
+        sname -- the match name
+        game_num -- the game number
+        record -- the record (see Match.play_game; 'sgf' holds the contents)
+        worker -- the worker name (for the run log)
+        """
+        with self.cond:
+            if sname not in self.matches:
+                return  # e.g. stopped by StopRule meanwhile
+            match = self.matches[sname]
+            self.received[sname][game_num] = (record, worker)
+            while self.next_game[sname] in self.received[sname]:
+                num = self.next_game[sname]
+                record, worker = self.received[sname].pop(num)
+                match.write_record(num, record, worker)
+                self.next_game[sname] = num + 1
+                if match.stop_rule:
+                    # counted here: the sinks write asynchronously
+                    data = record['data']
+                    winner = {WHITE: data['white'],
+                              BLACK: data['black']}.get(data['winner'])
+                    tally = self.tally[sname]
+                    if winner == match.engine_names[0]:
+                        tally[0] += 1
+                    elif winner == match.engine_names[1]:
+                        tally[2] += 1
+                    else:
+                        tally[1] += 1  # no winner counts as a draw
+                    if match.check_stop_rule(tuple(tally), num):
+                        self._end_match(sname)
+                        return
+            if self.next_game[sname] > match.num_games:
+                self._end_match(sname)
+
+    def _serve(self, conn, addr):
+        """Talk to a worker (in its own thread), until done or lost
+
+        Arguments:
+        conn -- the connected socket
+        addr -- the worker's address
+        """
+        name = str(addr) or 'worker'
+        current = None
+        try:
+            stream = conn.makefile('rw', encoding='utf-8', newline='\n')
+            msg = recv_msg(stream)
+            name = msg.get('worker', name)
+            print_err('Worker {} connected.'.format(name))
+            send_msg(stream, {'type': 'config', 'config': self.config_text})
+            last = None
+            while True:
+                msg = recv_msg(stream)
+                if msg['type'] == 'result':
+                    self._complete(msg['match'], msg['game'], msg, name)
+                elif msg['type'] == 'error':
+                    self._requeue(msg['match'], msg['game'], msg['error'])
+                current = None
+                assignment = self._assign(last)
+                if assignment is None:
+                    send_msg(stream, {'type': 'done'})
+                    break
+                current = assignment
+                last = current[0]
+                send_msg(stream, {'type': 'game', 'match': current[0],
+                                  'game': current[1]})
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print_err('Worker {} lost:'.format(name), sub=e)
+            if current:
+                self._requeue(*current)
+        finally:
+            conn.close()
+
+    def run(self, address):
+        """Serve workers at address until all matches are done; return the
+        number of aborted matches
+
+        Arguments:
+        address -- host:port (TCP) or the path of a Unix socket
+        """
+        with self.estack:
+            self._open_matches()
+            listener = dist_socket(address, listen=True)
+            with listener:
+                listener.settimeout(DIST_POLL)
+                print_err('Coordinator listening at {}'.format(address))
+                while True:
+                    with self.cond:
+                        if not self.matches:
+                            break
+                    try:
+                        conn, addr = listener.accept()
+                    except socket.timeout:
+                        continue
+                    conn.settimeout(None)
+                    if conn.family != getattr(socket, 'AF_UNIX', None):
+                        conn.setsockopt(socket.SOL_SOCKET,
+                                        socket.SO_KEEPALIVE, 1)
+                    threading.Thread(name='coordinator', target=self._serve,
+                                     args=(conn, addr), daemon=True).start()
+            if listener.family == getattr(socket, 'AF_UNIX', None):
+                os.unlink(address)
+        return self.aborted
 
 
 class DumbarbConfig:
@@ -1912,6 +5169,9 @@ class DumbarbConfig:
         self.show_progress = not (self._args.quiet or self._args.no_indicator)
         self.gtp_debug = self._args.gtp_debug
         self.outdir = self._args.outdir
+        self.coordinator = self._args.coordinator
+        self.shard = self._args.shard
+        self.worker = self._args.worker
         self._config = configparser.ConfigParser(
                 inline_comment_prefixes='#',
                 empty_lines_in_values=False)
@@ -1920,6 +5180,10 @@ class DumbarbConfig:
                            for file in self._args.config_files]
         self.match_sections = None
         self.engine_sections = None
+        self.tourney_sections = None
+        self.dump_lock = threading.Lock()  # concurrent tournament matches
+        self.cnf_file = None
+        self.latency = {}  # engine name: (latency stats, learned timeouts)
 
     def _read_config_files(self, config_files):
         """Read a list of config files"""
@@ -1932,12 +5196,34 @@ class DumbarbConfig:
         if problem_files:
             msg = 'Config file(s) read error: {}'
             raise ConfigError(msg.format(str(problem_files)))
-        sections = self._config.sections()
+        self._check_sections(config_files)
+
+    def load_string(self, text):
+        """Load config from a string (worker: the coordinator's session)"""
+        try:
+            self._config.read_string(text)
+        except configparser.Error as e:
+            msg = 'Problem parsing session config: {}'
+            raise ConfigError(msg.format(e))
+        self._check_sections(['<coordinator session config>'])
+
+    def _check_sections(self, config_files):
+        """Sort sections into matches, engines, tournaments; check keys"""
+        sections = [x for x in self._config.sections()
+                    if not x.startswith('$')]
+        self.tourney_sections = [x for x in sections
+                                 if x.startswith(TOURNEY_PRE)]
+        # matches generated by tournaments carry the tournament label:
+        # [<engine1> <engine2> <label>] (labels are one word, see Tournament)
+        labels = {x.split()[1] for x in self.tourney_sections
+                  if len(x.split()) == 2}
         self.match_sections = [x for x in sections
-                               if ' ' in x and not x.startswith('$')]
-        self.engine_sections = [x for x in sections
-                                if ' ' not in x and not x.startswith('$')]
-        if not self.match_sections:
+                               if ' ' in x and x not in self.tourney_sections
+                               and not (len(x.split()) == 3
+                                        and x.split()[2] in labels)]
+        self.engine_sections = [x for x in sections if ' ' not in x
+                                and not x.startswith(TOURNEY_PRE)]
+        if not (self.match_sections or self.tourney_sections):
             msg = 'No match sections found in config file(s):\n   {}'
             raise ConfigError(msg.format(', '.join(config_files)))
         for sec in self._config.keys():
@@ -1950,6 +5236,7 @@ class DumbarbConfig:
         """Load config from args or session file"""
         cnf_file = os.path.join(session_dir, CNF_FILE)
         cnf_file_missing = not os.path.isfile(cnf_file)
+        self.cnf_file = cnf_file
         if self._arg_files:
             if not self.cont_matches or self._args.force:
                 if cnf_file_missing or self._args.force:
@@ -1976,10 +5263,33 @@ class DumbarbConfig:
                ' session')
         raise ConfigError(msg)
 
+    def add_match_section(self, sname, values):
+        """Add a match section generated by a tournament, unless present
+
+        Generated sections (labeled with the tournament label) are saved with
+        the session config, but are not listed in match_sections.
+
+        Arguments:
+        sname -- the match section name
+        values -- dict of config values for the section
+        """
+        if not self._config.has_section(sname):
+            self._config[sname] = values
+
+    def own_items(self, sname):
+        """Return a dict of the values set in a section (not defaulted)
+
+        Arguments:
+        sname -- the section name
+        """
+        defaults = self._config.defaults()
+        return {key: val for key, val in self._config.items(sname, raw=True)
+                if defaults.get(key) != val}
+
     def _dump_config(self, file):
         """Save complete configuration (except args) to a file"""
         try:
-            with open(file, 'w') as cnf_file:
+            with self.dump_lock, open(file, 'w') as cnf_file:
                 head_cmt = ('# Generated by {dum} {ver}.\n'
                             '# This file is needed to continue'
                             ' interrupted sessions\n\n')
@@ -1989,6 +5299,48 @@ class DumbarbConfig:
             msg = 'Could not save config to output directory: {}'
             raise ConfigError(msg.format(e))
 
+    def engine_latency(self, name):
+        """Return (latency stats, learned timeouts) dicts for an engine
+
+        The dicts are shared by all instances of the engine in the session.
+        Learned timeouts start from the engine's LearnedTimeouts value (see
+        save_learned_timeouts), if any.
+
+        Arguments:
+        name -- the engine name
+        """
+        if name not in self.latency:
+            learned = {}
+            value = self[name].get('learnedtimeouts', '')
+            for item in value.split():
+                category, _, secs = item.partition('=')
+                try:
+                    learned[category] = float(secs)
+                except ValueError:
+                    msg = 'Bad LearnedTimeouts value for {name}: {item}'
+                    raise ConfigError(msg.format(name=name, item=item))
+            self.latency[name] = ({}, learned)
+        return self.latency[name]
+
+    def save_learned_timeouts(self):
+        """Store learned timeouts as LearnedTimeouts, save session config
+
+        The session config is only rewritten if a value has changed, so that
+        continued sessions (-c) start with the learned timeouts.
+        """
+        changed = False
+        for name, (_, learned) in self.latency.items():
+            value = ' '.join('{}={:.3f}'.format(cat, secs)
+                             for cat, secs in sorted(learned.items()))
+            if value and value != self[name].get('learnedtimeouts'):
+                self[name]['learnedtimeouts'] = value
+                changed = True
+        if changed and self.cnf_file:
+            try:
+                self._dump_config(self.cnf_file)
+            except ConfigError as e:
+                print_err('Could not save learned timeouts:', sub=e)
+
     def __getitem__(self, key):
         """Provide access to config sections (engine/match defs) """
         try:
@@ -2032,6 +5384,28 @@ class DumbarbConfig:
                 dest='cont_matches',
                 action='store_true',
                 help='continue an interrupted session')
+        def shard(value):
+            try:
+                index, count = (int(x) for x in value.split('/'))
+            except ValueError:
+                index = count = 0
+            if not 1 <= index <= count:
+                raise argparse.ArgumentTypeError('expected i/n, 1 <= i <= n')
+            return index, count
+
+        arg_parser.add_argument(
+                '--shard',
+                metavar='<i/n>',
+                type=shard,
+                help='play only games i, i+n, i+2n, ... (shard-suffixed logs)')
+        arg_parser.add_argument(
+                '--coordinator',
+                metavar='<address>',
+                help='hand out games to workers at host:port or socket path')
+        arg_parser.add_argument(
+                '--worker',
+                metavar='<address>',
+                help='play games for the coordinator at <address>')
         arg_parser.add_argument(
                 '-I', '--no-indicator',
                 action='store_true',
@@ -2092,6 +5466,371 @@ def print_err(message='', end='\n', flush=True, prefix='<ARB> ',
             sys.stderr.flush()
 
 
+def parse_cpu_list(cpu_list):
+    """Return the set of CPUs in a list such as '0-3,8'"""
+    cpus = set()
+    for item in cpu_list.split(','):
+        first, _, last = item.strip().partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def format_cpu_list(cpus):
+    """Return a list such as '0-3,8' for an iterable of CPUs"""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ','.join(str(first) if first == last
+                    else '{}-{}'.format(first, last)
+                    for first, last in ranges)
+
+
+def numa_nodes(cpus):
+    """Return the NUMA nodes (Linux sysfs) of CPUs as a list such as '0,1'
+
+    Returns '0' if the topology is not available.
+    """
+    nodes = set()
+    for node_dir in glob.glob(NUMA_NODES):
+        try:
+            with open(os.path.join(node_dir, 'cpulist')) as f:
+                node_cpus = parse_cpu_list(f.read().strip() or '-1')
+        except (OSError, ValueError):
+            continue
+        if node_cpus & set(cpus):
+            nodes.add(int(os.path.basename(node_dir)[4:]))
+    return format_cpu_list(nodes) if nodes else '0'
+
+
+def set_thread_sched(policy, priority):
+    """Set the calling thread's scheduling policy; return the outcome
+
+    Arguments:
+    policy -- a key of SCHED_POLICIES ('fifo' or 'rr')
+    priority -- the real-time priority (1-99)
+    """
+    desc = '{} {}'.format(SCHED_POLICIES[policy], priority)
+    try:
+        sched = getattr(os, SCHED_POLICIES[policy])
+        os.sched_setscheduler(0, sched, os.sched_param(priority))
+        granted = os.sched_getscheduler(0) == sched
+    except (AttributeError, OSError) as e:
+        return '{} not granted ({})'.format(desc, e)
+    return '{} {}'.format(desc, 'granted' if granted else 'not granted')
+
+
+def read_gtp(stream, resp_queue, gtp_down, engine):
+    """Read GTP responses from stream into resp_queue until EOF/error
+
+    Puts each response (see GtpResponses) in the response queue, with the
+    time it was read. Sets gtp_down when it can no longer read.
+
+    Arguments:
+    stream -- binary stream to read (engine stdout, socket file)
+    resp_queue -- the response queue
+    gtp_down -- the event to set on EOF/error
+    engine -- function returning the engine to report to (the user of a
+              GtpConnection can change while reading)
+    """
+    responses = GtpResponses()
+    try:
+        for byteline in stream:
+            response = responses.feed(byteline)
+            if response is None:
+                continue
+            if engine().gtp_debug:
+                engine()._engerr('Received: {}'.format(response))
+            resp_queue.put((response, datetime.datetime.utcnow()))
+        if engine().show_debug:
+            engine()._engerr('GTP -EOF-')
+        gtp_down.set()
+    except OSError as e:
+        engine()._engerr('GTP read error: {}'.format(e))
+        gtp_down.set()
+
+
+def fan_out(func, engines):
+    """Call func(engine) for each engine concurrently, one thread per engine
+
+    Returns after all calls have finished. Each failure is reported with the
+    engine's name; if there were any, the most severe exception is re-raised
+    (AllAbort, then unexpected errors, then PermanentEngineError, then other
+    dumbarb exceptions). With a single engine, func is simply called.
+
+    Arguments:
+    func -- a function taking a ManagedEngine as its only argument
+    engines -- an iterable of ManagedEngine objects
+    """
+    engines = list(engines)
+    if len(engines) <= 1:
+        for engine in engines:
+            func(engine)
+        return
+    errors = []
+
+    def run(engine):
+        try:
+            func(engine)
+        except BaseException as e:  # re-raised in calling thread
+            errors.append((engine, e))
+
+    threads = [threading.Thread(name='fan-out', target=run, args=(engine,),
+                                daemon=True)
+               for engine in engines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if not errors:
+        return
+
+    def severity(error):
+        exc = error[1]
+        if isinstance(exc, AllAbort):
+            return 0
+        if not isinstance(exc, DumbarbException):
+            return 1
+        if isinstance(exc, PermanentEngineError):
+            return 2
+        return 3
+
+    errors.sort(key=severity)
+    for engine, exc in errors[1:]:
+        msg = '[{name}] {et} (reported along with a more severe error):'
+        print_err(msg.format(name=engine.name, et=exc.__class__.__name__),
+                  sub=exc)
+    raise errors[0][1]
+
+
+def logged_results(filename, engine_names):
+    """Return the first engine's (wins, draws, losses) from a results log
+
+    Games without a winner count as draws; notes (e.g. StopRule verdicts)
+    are skipped. A missing log counts as no games.
+
+    Arguments:
+    filename -- the results log
+    engine_names -- the names of the first and second engine
+    """
+    wins = losses = games = 0
+    try:
+        with open(filename) as log:
+            for line in log:
+                fields = line.split()
+                if line.startswith(FMT_STOP_PRE) or len(fields) < 8:
+                    continue
+                games += 1
+                if fields[7] == engine_names[0]:
+                    wins += 1
+                elif fields[7] == engine_names[1]:
+                    losses += 1
+    except FileNotFoundError:
+        pass
+    return (wins, games - wins - losses, losses)
+
+
+def run_match(sname, cnf, blacklist, core_slot=0, results=None,
+              engine_pool=None):
+    """Play a match, reporting errors; return 1 if aborted, else 0
+
+    Engines with permanent errors are added to the blacklist.
+
+    Arguments:
+    sname -- the match section name
+    cnf -- the DumbarbConfig object
+    blacklist -- set of names of engines with permanent errors
+    core_slot -- see Match (default 0)
+    results -- dict in which to store the first engine's (wins, draws,
+               losses) under sname, also for aborted or skipped (finished)
+               matches, if known (default None)
+    engine_pool -- see Match (default None)
+
+    Exceptions: AllAbort, KeyboardInterrupt
+    """
+    match = None
+    try:
+        match = Match(sname, cnf, blacklist=blacklist, core_slot=core_slot,
+                      engine_pool=engine_pool)
+        with match:
+            match.play()
+    except PermanentEngineError as e:
+        msg = ('Match [{match}] aborted with permanent error for engine'
+               ' {ename}:')
+        print_err(msg.format(match=sname, ename=e.engine_name), sub=e)
+        blacklist.add(e.engine_name)
+        print_err('Engine blacklisted.')
+        if cnf.show_debug:
+            trfmt = traceback.format_exception(*sys.exc_info())
+            print_err(sub=''.join(trfmt))
+        return 1
+    except (ConfigError, GtpException, MatchAbort,
+            OSError, ValueError) as e:
+        msg = 'Match [{match}] aborted ({et}):'
+        print_err(msg.format(match=sname, et=e.__class__.__name__), sub=e)
+        if cnf.show_debug:
+            trfmt = traceback.format_exception(*sys.exc_info())
+            print_err(sub=''.join(trfmt))
+        return 1
+    finally:
+        if results is not None and match and match.results is not None:
+            results[sname] = match.results
+    return 0
+
+
+async def async_play_game(black, white, rules=None):
+    """Play a game between two started AsyncEngines, return the Game
+
+    The game runs in the loop's default executor (one thread per game;
+    set a larger executor with loop.set_default_executor() to play more
+    games at once). The result is in the Game's winner and win_reason
+    (as in the .log file), with move_list, move_times, time_vio_str, etc.
+
+    Arguments:
+    black -- the AsyncEngine playing black
+    white -- the AsyncEngine playing white
+    rules -- GameRules (default: GameRules())
+
+    Exceptions: PermanentEngineError
+    """
+    game = Game(white, black, rules if rules else GameRules())
+    await asyncio.get_running_loop().run_in_executor(None, game.play)
+    return game
+
+
+async def async_run_match(engine1, engine2, num_games, rules=None):
+    """Async generator: play num_games games, yield each finished Game
+
+    The engines (started AsyncEngines) alternate colors, engine1 playing
+    white in the first game. Games are played one after another; run
+    several matches (with their own engines) to play in parallel.
+
+    Arguments:
+    engine1, engine2 -- the AsyncEngines
+    num_games -- the number of games
+    rules -- GameRules (default: GameRules())
+    """
+    for game_num in range(num_games):
+        if game_num % 2:
+            yield await async_play_game(engine1, engine2, rules)
+        else:
+            yield await async_play_game(engine2, engine1, rules)
+
+
+def dist_socket(address, listen=False, timeout=None):
+    """Return a socket connected to (or listening at) address
+
+    Arguments:
+    address -- host:port (TCP) or the path of a Unix socket (contains a /)
+    listen -- listen instead of connecting (default False)
+    timeout -- max seconds to wait for the connection (default None)
+    """
+    if '/' in address:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if listen:
+            if os.path.exists(address):
+                os.unlink(address)  # left over from an earlier session
+            sock.bind(address)
+            sock.listen()
+        else:
+            sock.settimeout(timeout)
+            try:
+                sock.connect(address)
+            except OSError:
+                sock.close()
+                raise
+            sock.settimeout(None)
+        return sock
+    host, _, port = address.rpartition(':')
+    if listen:
+        return socket.create_server((host, int(port)))
+    sock = socket.create_connection((host, int(port)), timeout)
+    sock.settimeout(None)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    return sock
+
+
+def send_msg(stream, msg):
+    """Send a coordinator/worker message (a JSON object on one line)"""
+    stream.write(json.dumps(msg) + '\n')
+    stream.flush()
+
+
+def recv_msg(stream):
+    """Receive a coordinator/worker message
+
+    Exceptions: ConnectionError (connection closed), ValueError (bad JSON)
+    """
+    line = stream.readline()
+    if not line:
+        raise ConnectionError('connection closed')
+    return json.loads(line)
+
+
+def run_worker(cnf, blacklist):
+    """Play games assigned by the coordinator; return the number of failures
+
+    Matches are played in local match dirs (with the engines' stderr logs,
+    run logs, and local copies of the results). A match is kept open, with
+    its engines running, until a game of another match is assigned.
+
+    Arguments:
+    cnf -- the DumbarbConfig object (not loaded; the coordinator's session
+           config is used)
+    blacklist -- set of names of engines with permanent errors
+    """
+    failures = 0
+    match = None
+    with contextlib.closing(dist_socket(cnf.worker)) as sock:
+        stream = sock.makefile('rw', encoding='utf-8', newline='\n')
+        name = '{}:{}'.format(socket.gethostname(), os.getpid())
+        send_msg(stream, {'type': 'hello', 'worker': name})
+        cnf.load_string(recv_msg(stream)['config'])
+        print_err('Worker {} connected to {}'.format(name, cnf.worker))
+        send_msg(stream, {'type': 'ready'})
+        try:
+            while True:
+                msg = recv_msg(stream)
+                if msg['type'] == 'done':
+                    if match:
+                        match.finish()
+                    break
+                sname, game_num = msg['match'], msg['game']
+                try:
+                    if match and match.name != sname:
+                        match.finish()
+                        match.__exit__(None, None, None)
+                        match = None
+                    if not match:
+                        match = Match(sname, cnf, blacklist).__enter__()
+                    record = match.play_game(game_num)
+                    if record['sgf']:
+                        with open(record['sgf'], encoding='utf-8') as file:
+                            record['sgf'] = file.read()
+                    send_msg(stream, dict(record, type='result', match=sname,
+                                          game=game_num))
+                except (ConfigError, GtpException, MatchAbort, OSError,
+                        ValueError) as e:
+                    msg = 'Match [{match}] game {num} failed ({et}):'
+                    print_err(msg.format(match=sname, num=game_num,
+                                         et=e.__class__.__name__), sub=e)
+                    if isinstance(e, PermanentEngineError):
+                        blacklist.add(e.engine_name)
+                    if match:
+                        match.__exit__(type(e), e, None)
+                        match = None
+                    failures += 1
+                    send_msg(stream, {'type': 'error', 'match': sname,
+                                      'game': game_num, 'error': str(e)})
+        finally:
+            if match:
+                match.__exit__(None, None, None)
+    print_err('Worker done.')
+    return failures
+
+
 def dumbarb_main():
     """Main function"""
     blacklist = set()  # engines with permanent errors
@@ -2109,6 +5848,15 @@ def dumbarb_main():
         except OSError as e:
             print_err('Problem with output directory:', sub=e)
             sys.exit(124)
+    if cnf.worker:
+        try:
+            sys.exit(max(120, run_worker(cnf, blacklist)))
+        except KeyboardInterrupt:
+            print_err('Exiting...')
+            sys.exit(122)
+        except (ConfigError, OSError, ValueError) as e:
+            print_err('Worker error:', sub=e)
+            sys.exit(121)
     try:
         cnf.load(os.getcwd())
     except (ConfigError, OSError) as e:
@@ -2116,36 +5864,33 @@ def dumbarb_main():
         sys.exit(123)
 
     aborted = 0
-    for sname in cnf.match_sections:
-        if sname.startswith('$'):
-            continue
-        try:
-            with Match(sname, cnf, blacklist=blacklist) as match:
-                match.play()
-        except KeyboardInterrupt:
-            print_err('Exiting...')
-            sys.exit(122)
-        except PermanentEngineError as e:
-            msg = ('Match [{match}] aborted with permanent error for engine'
-                   ' {ename}:')
-            print_err(msg.format(match=sname, ename=e.engine_name), sub=e)
-            blacklist.add(e.engine_name)
-            print_err('Engine blacklisted.')
-            if cnf.show_debug:
-                trfmt = traceback.format_exception(*sys.exc_info())
-                print_err(sub=''.join(trfmt))
-            aborted += 1
-        except (ConfigError, GtpException, MatchAbort,
-                OSError, ValueError) as e:
-            msg = 'Match [{match}] aborted ({et}):'
-            print_err(msg.format(match=sname, et=e.__class__.__name__), sub=e)
-            if cnf.show_debug:
-                trfmt = traceback.format_exception(*sys.exc_info())
-                print_err(sub=''.join(trfmt))
-            aborted += 1
-        except AllAbort as e:
-            print_err('Something bad happened. Aborting all matches.', sub=e)
-            exit(121)
+    try:
+        if cnf.coordinator:
+            try:
+                aborted = Coordinator(cnf, blacklist).run(cnf.coordinator)
+            except (OSError, ValueError) as e:
+                print_err('Coordinator error:', sub=e)
+                sys.exit(121)
+            sys.exit(max(120, aborted))
+        for sname in cnf.match_sections:
+            aborted += run_match(sname, cnf, blacklist)
+        for tname in cnf.tourney_sections:
+            try:
+                tourney = Tournament(tname, cnf)
+            except ConfigError as e:
+                print_err('Tournament [{}] skipped:'.format(tname), sub=e)
+                aborted += 1
+                continue
+            aborted += tourney.run(
+                    lambda sname, slot, results, pool: run_match(
+                            sname, cnf, blacklist, core_slot=slot,
+                            results=results, engine_pool=pool))
+    except KeyboardInterrupt:
+        print_err('Exiting...')
+        sys.exit(122)
+    except AllAbort as e:
+        print_err('Something bad happened. Aborting all matches.', sub=e)
+        exit(121)
 
     sys.exit(max(120, aborted))
 
@@ -21,16 +21,27 @@ See https://github.com/StanTraykov/dumbarb for more info.
 
 import argparse
 import datetime
+import gzip
 import hashlib
+import heapq
 import inspect
+import itertools
+import math
 import os
 import random
 import re
+import socket
 import string
+import subprocess
 import sys
 import textwrap
+import threading
 import time
 import zlib
+try:
+    import sqlite3
+except ImportError:  # Python built without SQLite
+    sqlite3 = None
 
 
 DU_VER = '0.3.5'
@@ -382,9 +393,15 @@ def summary(filename, fnum):
     maxmoves = 0
     minmoves = 999
     nowinner = {'jigo': 0, 'notsco': 0, 'error': 0}
+    adjudged = {'Adj': 0, 'MaxMv': 0}  # dumbarb REASON_ADJU, REASON_MAXM
     fset = set()
+    notes = []
     with open(filename, 'r') as stream:
         for line in stream:
+            # notes, e.g. early stopping verdicts (StopRule)
+            if '#' in line.split()[:fnum]:
+                notes.append(line.split('#', 1)[1].strip())
+                continue
             field = insert + line.split()
 
             # game count
@@ -433,6 +450,11 @@ def summary(filename, fnum):
             else:
                 nowinner['error'] += 1
 
+            # adjudicated / MaxMoves games (reason: W+Adj, Jigo Adj, ...)
+            reason = field[9].rpartition('+')[2]
+            if reason in adjudged:
+                adjudged[reason] += 1
+
             # moves, thinking times
             mvs = int(field[10])
             totmoves += mvs
@@ -469,6 +491,8 @@ def summary(filename, fnum):
         fo_nw = {'jigo': '** jigos: {}',
                  'notsco': '** unscored games: {}',
                  'error': '** games with errors: {}'}
+        fo_adj = {'Adj': '** adjudicated games: {} (included above)',
+                  'MaxMv': '** games ended at MaxMoves: {} (included above)'}
 
         # total thinking times, formatted
         ft = str(datetime.timedelta(seconds=round(fir['ttt'])))
@@ -513,6 +537,12 @@ def summary(filename, fnum):
         for key, val in nowinner.items():
             if val > 0:
                 print(fo_nw[key].format(val))
+        for key, val in adjudged.items():
+            if val > 0:
+                print(fo_adj[key].format(val))
+
+        for note in notes:
+            print('** ' + note)
 
 
 # ======== duplicates finder ========
@@ -583,6 +613,595 @@ def finddups_path(path, checkfunc):
                        sec=time_taken, skip=len(skipped)))
 
 
+# ======== segmented stderr extractor ========
+
+ERRIDX_LEN = 42  # length of an index record, as written by dumbarb
+
+
+def find_err_segment(idx_file, game_num):
+    # records are normally one per game in order, so try direct access first;
+    # fall back to a scan (interrupted sessions), last record wins
+    with open(idx_file, 'rb') as idx:
+        idx.seek((game_num - 1) * ERRIDX_LEN)
+        rec = idx.read(ERRIDX_LEN).split()
+        if len(rec) == 3 and int(rec[0]) == game_num:
+            return int(rec[1]), int(rec[2])
+        idx.seek(0)
+        found = None
+        for line in idx:
+            rec = line.split()
+            if len(rec) == 3 and int(rec[0]) == game_num:
+                found = int(rec[1]), int(rec[2])
+        return found
+
+
+def extract_err(idx_file, game_num):
+    if not idx_file.endswith('.idx'):
+        idx_file = os.path.splitext(idx_file)[0] + '.idx'
+    log_file = idx_file[:-4] + '.log'
+    try:
+        segment = find_err_segment(idx_file, game_num)
+        if segment is None:
+            prt_err('Game {0} not found in {1}'.format(game_num, idx_file))
+            sys.exit(1)
+        start, end = segment
+        with open(log_file, 'rb') as log:
+            log.seek(start)
+            left = end - start
+            while left > 0:
+                chunk = log.read(min(left, 1 << 20))
+                if not chunk:
+                    break
+                sys.stdout.buffer.write(chunk)
+                left -= len(chunk)
+        sys.stdout.flush()
+    except (OSError, ValueError) as e:
+        eprint_exit(e, fatal=True)
+
+
+# ======== shard log merger ========
+
+GAMENUM_RE = re.compile(r'\[(\d+)\]')  # [<game number>], first on the line
+
+
+def shard_lines(filename):
+    # yield (game number, line) for game lines; notes (# ...) are reported
+    with open(filename, 'r') as stream:
+        for line in stream:
+            if line.startswith('#'):
+                prt_err('{0}: skipped note: {1}'.format(filename,
+                                                        line.strip()))
+                continue
+            match = GAMENUM_RE.search(line)
+            if not match:
+                raise FmtError
+            yield int(match.group(1)), line
+
+
+def merge(out_file, in_files, renumber):
+    # streaming k-way merge of game-ordered .log/.mvtimes files; of duplicate
+    # games, the one from the file given last is kept (the merge is stable)
+    if os.path.exists(out_file):
+        prt_err('Output file exists: {0}'.format(out_file))
+        sys.exit(1)
+    gaps = dups = count = 0
+    prev = 0
+    parity = False  # renumbered a game from odd to even or vice versa
+    pending = None
+    merged = heapq.merge(*(shard_lines(f) for f in in_files),
+                         key=lambda rec: rec[0])
+    with open(out_file, 'x') as out:
+        for num, line in itertools.chain(merged, [(None, None)]):
+            if num is not None and num == prev:
+                prt_err('Duplicate game {0} (keeping the one from the later'
+                        ' file)'.format(num))
+                dups += 1
+                pending = line
+                continue
+            if pending:
+                count += 1
+                if renumber and prev != count:
+                    parity |= (prev - count) % 2 == 1
+                    match = GAMENUM_RE.search(pending)
+                    width = len(match.group(1))
+                    pending = '{0}[{1:0{2}}]{3}'.format(
+                            pending[:match.start()], count, width,
+                            pending[match.end():])
+                out.write(pending)
+            if num is None:
+                break
+            if num != prev + 1:
+                prt_err('Gap: game(s) {0}-{1} missing'.format(prev + 1,
+                                                               num - 1))
+                gaps += 1
+            pending = line
+            prev = num
+    msg = '{0} games merged into {1}; {2} gap(s), {3} duplicate(s) skipped'
+    prt_err(msg.format(count, out_file, gaps, dups))
+    if parity:
+        prt_err('Warning: some games changed from odd to even numbers or vice'
+                ' versa. Their colors are as played, but dumbarb assigns'
+                ' colors by game number parity, so a match continued with -c'
+                ' from this file may have unbalanced colors.')
+    if gaps and not renumber:
+        prt_err('Use -M to renumber games (continuing a match with -c needs'
+                ' consecutive game numbers).')
+        sys.exit(1)
+
+
+def merge_cmd(out_file, in_files, renumber):
+    try:
+        merge(out_file, in_files, renumber)
+    except OSError as e:
+        eprint_exit(e, fatal=True)
+
+
+# ======== results database ========
+
+DB_SHARD_RE = re.compile(r'\.shard\d+-\d+$')  # dumbarb FMT_SHARD suffix
+DB_STAMP = '%y%m%d-%H:%M:%S'  # result log timestamp
+
+# default report (-q without a query): one row per engine
+DB_REPORT_GAMES = (
+        "SELECT engine, COUNT(*), SUM(winner = color),"
+        " SUM(color = 'W'), SUM(color = 'W' AND winner = 'W'),"
+        " SUM(color = 'B' AND winner = 'B'), AVG(moves)"
+        " FROM (SELECT white AS engine, 'W' AS color, winner, moves"
+        "       FROM games UNION ALL"
+        "       SELECT black, 'B', winner, moves FROM games)"
+        " GROUP BY engine")
+DB_REPORT_MOVES = ('SELECT engine, COUNT(*), AVG(time), MAX(time)'
+                   ' FROM moves GROUP BY engine')
+DB_REPORT_VIOS = ("SELECT engine, COUNT(*),"
+                  " COUNT(DISTINCT game || ' ' || match)"
+                  " FROM violations GROUP BY engine")
+DB_REPORT_HEAD = ('engine', 'games', 'wins', 'win%', 'as W', 'W wins',
+                  'B wins', 'avg mvs', 'moves', 'avg t/mv', 'max t/mv',
+                  'vio gms', 'viols')
+
+
+def open_text(filename):
+    # open a log for reading, gzipped (archive sink) or not
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'rt')
+    return open(filename, 'r')
+
+
+def db_connect(db_file):
+    # the schema (and its version check) is dumbarb's
+    import dumbarb
+    return dumbarb.SqliteSink.connect(db_file)
+
+
+def db_log_games(filename, match):
+    # yield game records (as dumbarb's Match.game_record) from a results log
+    with open_text(filename) as stream:
+        for line in stream:
+            if line.startswith('#'):  # notes
+                continue
+            field = [None] + line.split()
+            if len(field) < 21 or field[19] != 'VIO:' \
+                    or {field[4], field[6]} != {'W', 'B'}:
+                raise FmtError
+            try:
+                num = int(field[2].strip('[]'))
+                stamp = datetime.datetime.strptime(field[1], DB_STAMP)
+                moves = int(field[10])
+            except ValueError:
+                raise FmtError from None
+            if field[4] == 'W':
+                white, black = field[3], field[5]
+            else:
+                white, black = field[5], field[3]
+            if field[8] in (white, black):  # e.g. W+Resign
+                winner, _, reason = field[9].partition('+')
+            else:  # Jigo, None, UFIN, ERR
+                winner, reason = field[8], field[9]
+            vio = ' '.join(field[20:])
+            yield {'match': match, 'game': num, 'time': stamp.isoformat(),
+                   'white': white, 'black': black, 'winner': winner,
+                   'reason': reason, 'moves': moves,
+                   'violations': None if vio == 'None' else vio,
+                   'move_list': []}
+
+
+def db_mvtimes(filename):
+    # yield (game number, [(move number, coord, secs, user, sys), ...])
+    with open_text(filename) as stream:
+        for line in stream:
+            if line.startswith('#'):
+                continue
+            seqno, *entries = line.split()
+            moves = []
+            try:
+                num = int(seqno.strip('[]'))
+                for entry in entries:
+                    mvnum, coord, secs, *cpu = entry.split(':')
+                    cpu = [None if x == '-' else float(x) for x in cpu]
+                    moves.append((int(mvnum), coord, float(secs))
+                                 + tuple(cpu or (None, None)))
+            except ValueError:
+                raise FmtError from None
+            yield num, moves
+
+
+def db_import_log(db, filename):
+    # import a results log and its .mvtimes (if any) in one transaction;
+    # games already in the database are replaced
+    import dumbarb
+    base, ext = filename[:-len('.log.gz')], '.gz'
+    if not filename.endswith('.log.gz'):
+        base, ext = filename[:-len('.log')], ''
+    match = DB_SHARD_RE.sub('', os.path.basename(base)).replace('_', ' ')
+    mvt_file = base + '.mvtimes' + ext
+    mvtimes = iter(db_mvtimes(mvt_file) if os.path.exists(mvt_file) else ())
+    pending = next(mvtimes, None)
+    count = timed = 0
+    with db:
+        for record in db_log_games(filename, match):
+            # both files are in game order; skip games absent from the log
+            while pending and pending[0] < record['game']:
+                pending = next(mvtimes, None)
+            if pending and pending[0] == record['game']:
+                record['move_list'] = [list(rest) for mvnum, *rest
+                                       in sorted(pending[1])]
+                timed += 1
+                pending = next(mvtimes, None)
+            dumbarb.SqliteSink.store(db, record)
+            count += 1
+    msg = '{0}: {1} games ({2} with move times) imported as match "{3}"'
+    prt_err(msg.format(filename, count, timed, match))
+
+
+def db_log_files(path):
+    # yield results logs in path (a file or a dir, walked recursively)
+    if not os.path.isdir(path):
+        yield path
+        return
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = sorted(d for d in dirnames if d != 'stderr')
+        for name in sorted(filenames):
+            if name.endswith('.log') or name.endswith('.log.gz') \
+                    and name[:-len('.gz')] not in filenames:
+                yield os.path.join(dirpath, name)
+
+
+def db_import(db_file, paths):
+    db = db_connect(db_file)
+    try:
+        for path in paths:
+            for filename in db_log_files(path):
+                try:
+                    db_import_log(db, filename)
+                except FmtError:
+                    prt_err('{0}: not a dumbarb results log, skipped'
+                            .format(filename))
+    finally:
+        db.close()
+
+
+def print_table(head, rows):
+    # print rows (of query results) in aligned columns
+    def cell(val):
+        if val is None:
+            return ''
+        if isinstance(val, float):
+            return '{0:.6g}'.format(val)
+        return str(val)
+    # numbers are right-aligned
+    num = [all(isinstance(val, (int, float)) or val is None for val in col)
+           for col in zip(*rows)] or [False] * len(head)
+    rows = [[cell(val) for val in row] for row in rows]
+    widths = [max(len(val) for val in col) for col in zip(head, *rows)]
+    for row in [head] + rows:
+        print('  '.join(val.rjust(wid) if right else val.ljust(wid)
+                        for val, wid, right in zip(row, widths, num)).rstrip())
+
+
+def db_report(db):
+    # per-engine totals: games/wins by color, moves, times, violations
+    moves = {row[0]: row[1:] for row in db.execute(DB_REPORT_MOVES)}
+    vios = {row[0]: row[1:] for row in db.execute(DB_REPORT_VIOS)}
+    rows = []
+    for name, games, wins, as_w, w_wins, b_wins, avg_mvs \
+            in db.execute(DB_REPORT_GAMES):
+        mv_count, avg_t, max_t = moves.get(name, (0, None, None))
+        vio_count, vio_games = vios.get(name, (0, 0))
+        rows.append((name, games, wins, round(100 * wins / games, 1), as_w,
+                     w_wins, b_wins, round(avg_mvs, 1), mv_count, avg_t,
+                     max_t, vio_games, vio_count))
+    print_table(DB_REPORT_HEAD, sorted(rows))
+
+
+def db_query(db_file, sql):
+    if not os.path.exists(db_file):
+        prt_err('No such database: {0}'.format(db_file))
+        sys.exit(1)
+    db = db_connect(db_file)
+    try:
+        if not sql:
+            db_report(db)
+            return
+        cursor = db.execute(sql)
+        rows = cursor.fetchall()
+        if cursor.description:
+            print_table([col[0] for col in cursor.description], rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def db_cmd(func, *args):
+    if not sqlite3:
+        prt_err('This Python has no SQLite support (sqlite3 module).')
+        sys.exit(1)
+    try:
+        func(*args)
+    except (OSError, ImportError, sqlite3.Error) as e:
+        eprint_exit(e, fatal=True)
+
+
+# ======== ratings ========
+
+RATINGS_PRIOR = 2  # virtual draws added to each pairing (keeps 100% finite)
+RATINGS_TOL = 1e-6  # fit converged: no rating changed more (Elo)
+RATINGS_MAX_ITER = 10000
+RATINGS_Z = 1.959964  # two-sided 95% confidence interval
+RATINGS_HEAD = ('#', 'engine', 'Elo', '+/-', 'games', 'score%', 'opps',
+                'LOS')
+ELO_PER_NAT = 400 / math.log(10)  # Elo per natural-log strength unit
+
+
+def log_scores(filename):
+    # yield (name1, name2, score of name1) for scored games in a results log
+    with open_text(filename) as stream:
+        for line in stream:
+            if line.startswith('#'):  # notes
+                continue
+            field = [None] + line.split()
+            if len(field) < 21 or field[19] != 'VIO:':
+                raise FmtError
+            if field[8] == field[3]:
+                yield field[3], field[5], 1.0
+            elif field[8] == field[5]:
+                yield field[3], field[5], 0.0
+            elif field[8] == 'Jigo':
+                yield field[3], field[5], 0.5
+            # None, UFIN, ERR: no result
+
+
+def pair_results(paths):
+    # {(name1, name2): [score of name1, games]}, name1 < name2; the sparse
+    # pairwise results matrix of all logs in paths
+    pairs = {}
+    for path in paths:
+        for filename in db_log_files(path):
+            try:
+                for name1, name2, score in log_scores(filename):
+                    if name1 > name2:
+                        name1, name2, score = name2, name1, 1.0 - score
+                    res = pairs.setdefault((name1, name2), [0.0, 0])
+                    res[0] += score
+                    res[1] += 1
+            except FmtError:
+                prt_err('{0}: not a dumbarb results log, skipped'
+                        .format(filename))
+    return pairs
+
+
+def engine_groups(names, pairs):
+    # connected components of the graph of pairings (union-find)
+    parent = {name: name for name in names}
+
+    def root(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+    for name1, name2 in pairs:
+        parent[root(name1)] = root(name2)
+    groups = {}
+    for name in names:
+        groups.setdefault(root(name), []).append(name)
+    return list(groups.values())
+
+
+def bt_fit(num, pairs):
+    # Bradley-Terry maximum likelihood by minorization-maximization (Hunter
+    # 2004); pairs are (i, j, score of i, games), a draw counts half a win;
+    # returns log-strengths with mean 0; each iteration is one pass over the
+    # pairings, independent of the number of games
+    wins = [0.0] * num
+    for i, j, score, games in pairs:
+        wins[i] += score
+        wins[j] += games - score
+    theta = [0.0] * num
+    for _ in range(RATINGS_MAX_ITER):
+        gamma = [math.exp(t) for t in theta]
+        denom = [0.0] * num
+        for i, j, _, games in pairs:
+            part = games / (gamma[i] + gamma[j])
+            denom[i] += part
+            denom[j] += part
+        new = [math.log(w / d) for w, d in zip(wins, denom)]
+        mean = sum(new) / num
+        new = [t - mean for t in new]
+        change = max(abs(a - b) for a, b in zip(new, theta))
+        theta = new
+        if change * ELO_PER_NAT < RATINGS_TOL:
+            break
+    return theta
+
+
+def bt_covariance(theta, pairs):
+    # covariance of the log-strengths (mean fixed at 0): pseudo-inverse of
+    # the Fisher information H, computed as (H + 1/n)^-1 - 1/n (Gauss-Jordan)
+    num = len(theta)
+    mat = [[1 / num] * num + [float(r == c) for c in range(num)]
+           for r in range(num)]
+    for i, j, _, games in pairs:
+        prob = 1 / (1 + math.exp(theta[j] - theta[i]))
+        info = games * prob * (1 - prob)
+        mat[i][i] += info
+        mat[j][j] += info
+        mat[i][j] -= info
+        mat[j][i] -= info
+    for col in range(num):
+        pivot = max(range(col, num), key=lambda r: abs(mat[r][col]))
+        mat[col], mat[pivot] = mat[pivot], mat[col]
+        div = mat[col][col]
+        mat[col] = [val / div for val in mat[col]]
+        for row in range(num):
+            fac = mat[row][col]
+            if row != col and fac:
+                mat[row] = [a - fac * b for a, b in zip(mat[row], mat[col])]
+    return [[val - 1 / num for val in row[num:]] for row in mat]
+
+
+def ratings(paths):
+    # Elo ratings (mean 0) with 95% intervals, and the likelihood of
+    # superiority of each engine over the next one
+    start = time.monotonic()
+    results = pair_results(paths)
+    names = sorted({name for pair in results for name in pair})
+    if len(names) < 2:
+        prt_err('Not enough engines with scored games.')
+        sys.exit(1)
+    groups = engine_groups(names, results)
+    if len(groups) > 1:
+        prt_err('Cannot rate engines that are not connected by games;'
+                ' groups: ' + '; '.join(', '.join(grp) for grp in groups))
+        sys.exit(1)
+    idx = {name: i for i, name in enumerate(names)}
+    pairs = [(idx[name1], idx[name2], score + RATINGS_PRIOR / 2,
+              games + RATINGS_PRIOR)
+             for (name1, name2), (score, games) in results.items()]
+    theta = bt_fit(len(names), pairs)
+    cov = bt_covariance(theta, pairs)
+
+    # games, score, opponents (without the prior)
+    totals = {name: [0, 0.0, 0] for name in names}
+    for (name1, name2), (score, games) in results.items():
+        for name, pts in ((name1, score), (name2, games - score)):
+            totals[name][0] += games
+            totals[name][1] += pts
+            totals[name][2] += 1
+    order = sorted(range(len(names)), key=lambda i: -theta[i])
+    rows = []
+    for rank, i in enumerate(order):
+        games, score, opps = totals[names[i]]
+        los = None
+        if rank + 1 < len(order):
+            j = order[rank + 1]
+            var = cov[i][i] + cov[j][j] - 2 * cov[i][j]
+            los = round(50 * (1 + math.erf((theta[i] - theta[j])
+                                           / math.sqrt(2 * var))), 1)
+        rows.append((rank + 1, names[i], round(theta[i] * ELO_PER_NAT),
+                     round(RATINGS_Z * math.sqrt(cov[i][i]) * ELO_PER_NAT),
+                     games, round(100 * score / games, 1), opps, los))
+    print_table(RATINGS_HEAD, rows)
+    msg = ('{0} games, {1} engines, {2} pairings; rated in {3:.2f}s (LOS:'
+           ' likelihood of superiority over the next engine, %)')
+    prt_err(msg.format(sum(res[1] for res in results.values()), len(names),
+                       len(results), time.monotonic() - start))
+
+
+def ratings_cmd(paths):
+    try:
+        ratings(paths)
+    except OSError as e:
+        eprint_exit(e, fatal=True)
+
+
+# ======== GTP engine server ========
+
+SERVE_QUIT_WAIT = 5  # secs to let an engine exit after its client is gone
+
+
+def relay(src, write, done):
+    # copy src (a binary stream) to write() until EOF, then call done()
+    try:
+        for chunk in iter(lambda: src.read1(65536), b''):
+            write(chunk)
+    except OSError:
+        pass
+    finally:
+        done()
+
+
+def serve_client(conn, peer, cmd):
+    # one engine process per connection: socket <-> engine stdin/stdout
+    prt_err('{0}: connected, starting engine'.format(peer))
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE)
+    except OSError as e:
+        prt_err('{0}: cannot start engine: {1}'.format(peer, e))
+        conn.close()
+        return
+    sock_in = conn.makefile('rb')
+
+    def client_gone():
+        try:
+            proc.stdin.close()  # EOF: engine should exit
+        except OSError:
+            pass
+
+    def to_engine(chunk):
+        proc.stdin.write(chunk)
+        proc.stdin.flush()
+
+    def engine_gone():
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    upstream = threading.Thread(target=relay, daemon=True,
+                                args=(sock_in, to_engine, client_gone))
+    upstream.start()
+    relay(proc.stdout, conn.sendall, engine_gone)
+    try:
+        code = proc.wait(SERVE_QUIT_WAIT)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        code = proc.wait()
+    upstream.join()
+    sock_in.close()
+    conn.close()
+    prt_err('{0}: closed (engine exit code {1})'.format(peer, code))
+
+
+def serve(address, cmd):
+    # serve a GTP engine command at host:port (or a Unix socket path)
+    if '/' in address:
+        if os.path.exists(address):
+            os.unlink(address)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(address)
+        listener.listen()
+    else:
+        host, _, port = address.rpartition(':')
+        listener = socket.create_server((host, int(port)))
+    prt_err('Serving {0} at {1}'.format(' '.join(cmd), address))
+    with listener:
+        while True:
+            conn, peer = listener.accept()
+            if conn.family != socket.AF_UNIX:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=serve_client, daemon=True,
+                             args=(conn, peer or address, cmd)).start()
+
+
+def serve_cmd(address, cmd):
+    try:
+        serve(address, cmd)
+    except KeyboardInterrupt:
+        sys.exit(0)
+    except (OSError, ValueError) as e:
+        eprint_exit(e, fatal=True)
+
+
 class ArgError(Exception): pass
 class FmtError(Exception): pass
 
@@ -595,6 +1214,34 @@ def dumbu_main():
             sys.exit(1)
         if sys.argv[1] in ['-v', '--version']:
             prt_err('dumbutil v.' + DU_VER)
+        elif sys.argv[1] == '-e':
+            if len(sys.argv) != 4:
+                raise ArgError
+            try:
+                game_num = int(sys.argv[3])
+            except ValueError:
+                raise ArgError from None
+            extract_err(sys.argv[2], game_num)
+        elif sys.argv[1] in ['-m', '-M']:
+            if len(sys.argv) < 4:
+                raise ArgError
+            merge_cmd(sys.argv[2], sys.argv[3:], sys.argv[1] == '-M')
+        elif sys.argv[1] == '-q':
+            if len(sys.argv) not in (3, 4):
+                raise ArgError
+            db_cmd(db_query, sys.argv[2], ' '.join(sys.argv[3:]))
+        elif sys.argv[1] == '-i':
+            if len(sys.argv) < 4:
+                raise ArgError
+            db_cmd(db_import, sys.argv[2], sys.argv[3:])
+        elif sys.argv[1] in ['-r', '--ratings']:
+            if len(sys.argv) < 3:
+                raise ArgError
+            ratings_cmd(sys.argv[2:])
+        elif sys.argv[1] == '-T':
+            if len(sys.argv) < 4:
+                raise ArgError
+            serve_cmd(sys.argv[2], sys.argv[3:])
         elif len(sys.argv) != 3:
             raise ArgError
         elif sys.argv[1] == '-s':
@@ -616,6 +1263,18 @@ def dumbu_main():
                 'generate summaries (-S for old syntax)\n'
                 '{0} -d <path>          '
                 'check path and subdirs for duplicate SGFs\n'
+                '{0} -e <idx> <game>    '
+                'extract a game from a segmented stderr log\n'
+                '{0} -m <out> <file>... '
+                'merge shard .log/.mvtimes files (-M: renumber)\n'
+                '{0} -i <db> <path>...  '
+                'import .log/.mvtimes files into a results database\n'
+                '{0} -q <db> [<sql>]    '
+                'query a results database (default: engine report)\n'
+                '{0} -r|--ratings <dir> '
+                'Elo ratings from all .log files in dir(s)\n'
+                '{0} -T <addr> <cmd>... '
+                'serve a GTP engine at host:port (for Connect)\n'
                 '{0} -R <randy opts>    for Randy (try {0} -R --help)\n'
                 '{0} -v|--version       display version information and exit\n'
                 '{0} -h|--help          display this message\n')